@@ -12,5 +12,18 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', 'true')
+os.environ.setdefault('ASYNC_LOGIN_VIEW', 'true')
+
+# ASGI servers run each request's database work on a different thread,
+# so persistent connections are rarely reused. Use the in-process pool
+# instead when psycopg 3 and its pool are installed, unless DB_POOL says
+# otherwise.
+try:
+    import psycopg_pool  # noqa: F401
+except ImportError:
+    pass
+else:
+    os.environ.setdefault('DB_POOL', 'true')
 
 application = get_asgi_application()
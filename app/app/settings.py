@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'drf_spectacular',
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,9 +91,100 @@ DATABASES = {
         'NAME': os.environ.get("DB_NAME"),
         'USER': os.environ.get("DB_USER"),
         'PASSWORD': os.environ.get("DB_PASS"),
+        # Seconds a connection is reused across requests; 0 opens a new
+        # one for every request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Check a reused connection is still alive before using it.
+        'CONN_HEALTH_CHECKS': os.environ.get(
+            'DB_CONN_HEALTH_CHECKS', 'true',
+        ).lower() in ('1', 'true', 'yes'),
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 10)),
+        },
+    }
+}
+
+# An in-process connection pool, from psycopg[pool]. app/asgi.py turns
+# it on by default, as persistent connections are not shared between the
+# threads an ASGI server runs requests on. With CONN_HEALTH_CHECKS the
+# pool checks connections before handing them out.
+if os.environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        # Seconds a request waits for a free connection before failing.
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        # Seconds an idle connection above min_size is kept for.
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),
+    }
+
+
+# Read replicas of the primary, as a comma separated list of hosts with
+# the primary's name and credentials. Safe requests to the recipe, tag
+# and ingredient APIs read from a random one.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write.
+READ_YOUR_WRITES_SECONDS = int(
+    os.environ.get('READ_YOUR_WRITES_SECONDS', 5)
+)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+# Seconds a cached recipe, tag or ingredient list is kept for.
+RECIPE_LIST_CACHE_TIMEOUT = int(
+    os.environ.get('RECIPE_LIST_CACHE_TIMEOUT', 300)
+)
+
+# Seconds an authenticated API token is cached for.
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 300)
+)
+
+# Serve GET on the recipe, tag and ingredient lists and recipe detail
+# from async views. app/asgi.py turns this on by default; under WSGI the
+# sync views are faster.
+ASYNC_READ_VIEWS = os.environ.get(
+    'ASYNC_READ_VIEWS', '',
+).lower() in ('1', 'true', 'yes')
+
+# Serve POST on the token endpoint from an async view, which awaits the
+# password check instead of holding a thread. app/asgi.py turns this on
+# by default.
+ASYNC_LOGIN_VIEW = os.environ.get(
+    'ASYNC_LOGIN_VIEW', '',
+).lower() in ('1', 'true', 'yes')
+
+# Share of requests timed by RequestMetricsMiddleware, from 0 (off) to 1.
+REQUEST_METRICS_SAMPLE_RATE = float(
+    os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 0)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -112,6 +205,43 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashers. The first hashes new passwords; the others still
+# check older hashes, which are rehashed with the first on the next
+# successful login. PASSWORD_HASHER picks the first, Argon2 by default
+# when argon2-cffi is installed.
+try:
+    import argon2  # noqa: F401
+except ImportError:
+    _default_hasher = 'pbkdf2'
+else:
+    _default_hasher = 'argon2'
+_hashers = {
+    'argon2': 'user.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+}
+_preferred_hasher = _hashers[
+    os.environ.get('PASSWORD_HASHER', _default_hasher)
+]
+PASSWORD_HASHERS = [_preferred_hasher] + [
+    hasher for hasher in _hashers.values() if hasher != _preferred_hasher
+]
+
+# Argon2 passes, memory in KiB and lanes per hash. Passwords hashed with
+# other costs are rehashed on their next login.
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19456))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+
+# Threads logins hash passwords on, so at most this many cores hash at
+# once however many logins arrive.
+PASSWORD_HASH_WORKERS = int(os.environ.get(
+    'PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2),
+))
+
+AUTHENTICATION_BACKENDS = ['user.backends.HashWorkerBackend']
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -133,6 +263,21 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Longest edge in pixels of each resized copy made of recipe images.
+RECIPE_IMAGE_VARIANTS = {
+    'small': 320,
+    'medium': 960,
+}
+# Threads resizing uploaded images; 0 resizes inside the request.
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+# Uploads over these limits are rejected while they are streamed in.
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40_000_000)
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -144,6 +289,23 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        # Login attempts per email and client IP.
+        'login': os.environ.get('LOGIN_THROTTLE_RATE', '10/min'),
+        # Login attempts per client IP, for any email.
+        'login_ip': os.environ.get('LOGIN_IP_THROTTLE_RATE', '30/min'),
+        # Login attempts per email, from any client IP.
+        'login_email': os.environ.get('LOGIN_EMAIL_THROTTLE_RATE', '20/min'),
+    },
 }
 
 SPECTACULAR_SETTINGS = {
@@ -7,11 +7,14 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import serve_media, MetricsView
+
 
 urlpatterns = [
     path('api/user/v1/', include("user.urls")),
     path('api/recipe/v1/', include("recipe.urls")),
     path('admin/', admin.site.urls),
+    path('api/metrics/', MetricsView.as_view(), name='api-metrics'),
     path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
     path(
         "api/docs/",
@@ -23,5 +26,6 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL,
+        view=serve_media,
         document_root=settings.MEDIA_ROOT,
     )
@@ -0,0 +1,55 @@
+"""
+Helpers shared by the benchmark commands.
+"""
+import statistics
+import time
+
+from django.db import connections
+
+
+# Clearing the configured cache would drop the cached tokens, throttle
+# counters and list versions of every real user, so benchmarks run on
+# this one, with override_settings(CACHES=BENCHMARK_CACHES).
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+def add_plan_arguments(parser):
+    """Add the --repeat and --no-plans options to a command."""
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '--no-plans',
+        action='store_true',
+        help='Only print timings, not the EXPLAIN output.',
+    )
+
+
+def time_queryset(queryset, repeat):
+    """Return the median wall time in ms to fetch the queryset."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def write_plan(stdout, label, queryset, options):
+    """Write the row count and median time of a queryset, then its plan.
+
+    The plan is EXPLAIN ANALYZE on PostgreSQL, and left out with
+    --no-plans.
+    """
+    ms = time_queryset(queryset, options['repeat'])
+    stdout.write(f'{label}: {queryset.count()} rows, median {ms:.2f} ms')
+    if not options['no_plans']:
+        explain = {}
+        if connections[queryset.db].vendor == 'postgresql':
+            explain['analyze'] = True
+        stdout.write(queryset.explain(**explain))
+        stdout.write('')
@@ -0,0 +1,150 @@
+"""
+Deterministic synthetic data for benchmarks.
+"""
+import random
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from core.models import Recipe, Tag, Ingredient
+
+
+ADJECTIVES = [
+    'Spicy', 'Creamy', 'Roasted', 'Grilled', 'Quick', 'Smoky', 'Crispy',
+    'Slow Cooked', 'Lemony', 'Garlic', 'Honey', 'Herby', 'Baked', 'Fresh',
+]
+DISHES = [
+    'Chicken Curry', 'Tomato Soup', 'Lentil Stew', 'Beef Tacos', 'Risotto',
+    'Pad Thai', 'Salmon', 'Pancakes', 'Falafel', 'Lasagne', 'Ramen',
+    'Caesar Salad', 'Banana Bread', 'Shakshuka', 'Paella', 'Dumplings',
+]
+TAGS = [
+    'Dinner', 'Lunch', 'Breakfast', 'Vegan', 'Vegetarian', 'Quick',
+    'Dessert', 'Gluten Free', 'Spicy', 'Comfort Food', 'Healthy', 'Asian',
+    'Italian', 'Mexican', 'Budget', 'Party', 'Kids', 'Baking', 'Soup',
+]
+INGREDIENTS = [
+    'Salt', 'Pepper', 'Olive Oil', 'Garlic', 'Onion', 'Butter', 'Flour',
+    'Eggs', 'Milk', 'Sugar', 'Tomato', 'Lemon', 'Chicken', 'Rice', 'Basil',
+    'Ginger', 'Chili', 'Cumin', 'Cheese', 'Potato', 'Carrot', 'Beef',
+]
+
+
+def _names(words, count):
+    """Return count distinct names, numbering the words once used up."""
+    return [
+        words[i] if i < len(words) else f'{words[i % len(words)]} {i}'
+        for i in range(count)
+    ]
+
+
+class DatasetGenerator:
+    """Build the same users, recipes, tags and ingredients for a seed.
+
+    Tag and ingredient popularity follows a Zipf like curve and the
+    number per recipe varies around the given mean, so filters and
+    prefetches see a realistic fan-out. Everything is written with
+    bulk inserts.
+    """
+    batch_size = 5000
+
+    def __init__(self, seed=0, users=1, recipes=1000, tags=50,
+                 ingredients=200, tags_per_recipe=3,
+                 ingredients_per_recipe=8, email_prefix='bench'):
+        self.rng = random.Random(seed)
+        self.num_users = users
+        self.num_recipes = recipes
+        self.num_tags = tags
+        self.num_ingredients = ingredients
+        self.tags_per_recipe = tags_per_recipe
+        self.ingredients_per_recipe = ingredients_per_recipe
+        self.email_prefix = email_prefix
+        self.users = []
+        self.tags = {}
+        self.ingredients = {}
+        self.recipe_ids = {}
+
+    def _pick(self, objs, cum_weights, mean):
+        """Pick around mean distinct objects, favouring the first ones."""
+        count = min(self.rng.randint(0, 2 * mean), len(objs))
+        picked = {}
+        while len(picked) < count:
+            obj = self.rng.choices(objs, cum_weights=cum_weights)[0]
+            picked[obj.id] = obj
+        return list(picked.values())
+
+    def _create_user(self, index):
+        user = get_user_model().objects.create_user(
+            email=f'{self.email_prefix}-{index}@example.com',
+            password='benchmark-pass-123',
+            name=f'Benchmark user {index}',
+        )
+        self.users.append(user)
+        self.tags[user.id] = Tag.objects.bulk_create([
+            Tag(user=user, name=name)
+            for name in _names(TAGS, self.num_tags)
+        ])
+        self.ingredients[user.id] = Ingredient.objects.bulk_create([
+            Ingredient(user=user, name=name)
+            for name in _names(INGREDIENTS, self.num_ingredients)
+        ])
+
+        return user
+
+    def _create_recipes(self, user):
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=(
+                    f'{self.rng.choice(ADJECTIVES)} '
+                    f'{self.rng.choice(DISHES)} {i}'
+                ),
+                description=' '.join(
+                    self.rng.choice(INGREDIENTS).lower()
+                    for _ in range(self.rng.randint(5, 40))
+                ),
+                time_minutes=self.rng.randint(5, 180),
+                price=f'{self.rng.randint(100, 9999) / 100:.2f}',
+                link=f'https://example.com/recipes/{user.id}/{i}',
+            )
+            for i in range(self.num_recipes)
+        ], batch_size=self.batch_size)
+        self.recipe_ids[user.id] = [recipe.id for recipe in recipes]
+
+        for field, model, objs, mean in (
+                ('tags', Tag, self.tags[user.id], self.tags_per_recipe),
+                ('ingredients', Ingredient, self.ingredients[user.id],
+                 self.ingredients_per_recipe)):
+            if not objs or mean <= 0:
+                continue
+            cum_weights = list(accumulate(
+                1 / (rank + 1) for rank in range(len(objs))
+            ))
+            through = getattr(Recipe, field).through
+            fk = f'{model._meta.model_name}_id'
+            through.objects.bulk_create([
+                through(recipe_id=recipe.id, **{fk: obj.id})
+                for recipe in recipes
+                for obj in self._pick(objs, cum_weights, mean)
+            ], batch_size=self.batch_size)
+            model.objects.filter(user=user).rebuild_recipe_counts()
+
+        Recipe.objects.filter(user=user).update_search_vector()
+
+    def generate(self):
+        """Write the dataset and return the users."""
+        for index in range(self.num_users):
+            self._create_recipes(self._create_user(index))
+
+        tables = [
+            Recipe._meta.db_table,
+            Tag._meta.db_table,
+            Ingredient._meta.db_table,
+            Recipe.tags.through._meta.db_table,
+            Recipe.ingredients.through._meta.db_table,
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {", ".join(tables)}')
+
+        return self.users
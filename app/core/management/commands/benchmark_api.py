@@ -0,0 +1,287 @@
+"""
+Django command to benchmark the API endpoints on a synthetic dataset.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from io import BytesIO
+
+import django
+from PIL import Image
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmarking import BENCHMARK_CACHES
+from core.datagen import DatasetGenerator
+from core.metrics import percentile
+
+
+def _image(seed):
+    """Return a small PNG, different for every seed."""
+    buffer = BytesIO()
+    color = (seed % 256, (seed // 256) % 256, 128)
+    Image.new('RGB', (64, 64), color=color).save(buffer, format='PNG')
+    buffer.seek(0)
+    buffer.name = f'benchmark-{seed}.png'
+    return buffer
+
+
+class Command(BaseCommand):
+    """Seed a throwaway dataset and time requests to the APIs."""
+    help = (
+        'Benchmark the recipe, tag and user endpoints on a generated '
+        'dataset and report latency percentiles and query counts. All '
+        'seeded data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            help='Only run the scenarios with these names.',
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Keep the response and token caches between requests. '
+                 'By default they are cleared before every request. The '
+                 'benchmark uses a private in-process cache, so the '
+                 'configured cache is never touched.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this file.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON results of an earlier run to compare against.',
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            help='Fail if a p50 latency grows by more than this percentage '
+                 'or a query count grows, compared to --compare.',
+        )
+
+    def _scenarios(self, generator):
+        """Return (name, method, path, data factory) for every scenario."""
+        user = generator.users[0]
+        tags = generator.tags[user.id]
+        ingredients = generator.ingredients[user.id]
+        recipe_ids = generator.recipe_ids[user.id]
+        recipes_url = reverse('recipe:recipe-list')
+
+        def detail(i):
+            return reverse(
+                'recipe:recipe-detail',
+                args=[recipe_ids[i * 7919 % len(recipe_ids)]],
+            )
+
+        def create(i):
+            return {
+                'title': f'Benchmark recipe {i}',
+                'time_minutes': 30,
+                'price': '7.50',
+                'tags': [{'name': tag.name} for tag in tags[:3]],
+                'ingredients': [
+                    {'name': ingredient.name}
+                    for ingredient in ingredients[:8]
+                ],
+            }
+
+        filter_tags = ','.join(str(tag.id) for tag in tags[:2])
+        return [
+            ('recipe_list', 'get', lambda i: recipes_url,
+             lambda i: {'page_size': 50}),
+            ('recipe_list_sparse', 'get', lambda i: recipes_url,
+             lambda i: {'page_size': 50, 'fields': 'id,title'}),
+            ('recipe_filter_any', 'get', lambda i: recipes_url,
+             lambda i: {'page_size': 50, 'tags': filter_tags}),
+            ('recipe_filter_all', 'get', lambda i: recipes_url,
+             lambda i: {'page_size': 50, 'tags': filter_tags,
+                        'match': 'all'}),
+            ('recipe_search', 'get', lambda i: recipes_url,
+             lambda i: {'page_size': 50, 'search': 'chicken curry'}),
+            ('recipe_detail', 'get', detail, lambda i: None),
+            ('recipe_create', 'post', lambda i: recipes_url, create),
+            ('recipe_upload_image', 'post',
+             lambda i: reverse(
+                 'recipe:recipe-upload-image', args=[recipe_ids[0]],
+             ),
+             lambda i: {'image': _image(i)}),
+            ('tag_list', 'get', lambda i: reverse('recipe:tag-list'),
+             lambda i: None),
+            ('tag_autocomplete', 'get', lambda i: reverse('recipe:tag-list'),
+             lambda i: {'q': 'd'}),
+            ('ingredient_list', 'get',
+             lambda i: reverse('recipe:ingredient-list'), lambda i: None),
+            ('user_me', 'get', lambda i: reverse('user:me'),
+             lambda i: None),
+        ]
+
+    def _request(self, client, method, path, data):
+        if method == 'get':
+            return client.get(path, data)
+        if isinstance(data, dict) and 'image' in data:
+            return client.post(path, data, format='multipart')
+        return client.post(path, data, format='json')
+
+    def _run(self, client, scenario, options):
+        """Time one scenario and return its results."""
+        name, method, path, data = scenario
+        if not options['warm_cache']:
+            cache.clear()
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            res = self._request(client, method, path(0), data(0))
+        if res.status_code >= 400:
+            raise CommandError(
+                f'{name}: {method.upper()} {path(0)} returned '
+                f'{res.status_code}'
+            )
+
+        timings = []
+        for i in range(1, options['iterations'] + 1):
+            if not options['warm_cache']:
+                cache.clear()
+            request_path, request_data = path(i), data(i)
+            start = time.perf_counter()
+            self._request(client, method, request_path, request_data)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return {
+            'method': method.upper(),
+            'path': path(0),
+            'status': res.status_code,
+            'queries': len(queries),
+            'iterations': len(timings),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p90_ms': round(percentile(timings, 90), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'max_ms': round(max(timings), 3),
+        }
+
+    def _meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'git_commit': commit,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': options['iterations'],
+            'warm_cache': options['warm_cache'],
+            'dataset': {
+                key: options[key] for key in (
+                    'users', 'recipes', 'tags', 'ingredients',
+                    'tags_per_recipe', 'ingredients_per_recipe', 'seed',
+                )
+            },
+        }
+
+    def _compare(self, results, options):
+        """Print the change against a baseline and fail on regressions."""
+        with open(options['compare']) as f:
+            baseline = json.load(f)['results']
+
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            change = (result['p50_ms'] / before['p50_ms'] - 1) * 100
+            self.stdout.write(
+                f'{name}: p50 {before["p50_ms"]:.2f} -> '
+                f'{result["p50_ms"]:.2f} ms ({change:+.1f}%), queries '
+                f'{before["queries"]} -> {result["queries"]}'
+            )
+            limit = options['max_regression']
+            if limit is not None and (
+                    change > limit or result['queries'] > before['queries']):
+                regressions.append(name)
+
+        if regressions:
+            raise CommandError(f'Regressed: {", ".join(regressions)}')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1.')
+        results = {}
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root,
+                ALLOWED_HOSTS=['testserver'],
+                RECIPE_IMAGE_WORKERS=0,
+                CACHES=BENCHMARK_CACHES):
+            with transaction.atomic():
+                generator = DatasetGenerator(
+                    seed=options['seed'],
+                    users=options['users'],
+                    recipes=options['recipes'],
+                    tags=options['tags'],
+                    ingredients=options['ingredients'],
+                    tags_per_recipe=options['tags_per_recipe'],
+                    ingredients_per_recipe=options['ingredients_per_recipe'],
+                    email_prefix='benchmark-api',
+                )
+                generator.generate()
+                token = Token.objects.create(user=generator.users[0])
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+                for scenario in self._scenarios(generator):
+                    name = scenario[0]
+                    if options['only'] and name not in options['only']:
+                        continue
+                    results[name] = self._run(client, scenario, options)
+                    result = results[name]
+                    self.stdout.write(
+                        f'{name}: p50 {result["p50_ms"]:.2f} ms, '
+                        f'p90 {result["p90_ms"]:.2f} ms, '
+                        f'p99 {result["p99_ms"]:.2f} ms, '
+                        f'{result["queries"]} queries'
+                    )
+
+                transaction.set_rollback(True)
+            cache.clear()
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(
+                    {'meta': self._meta(options), 'results': results},
+                    f, indent=2,
+                )
+            self.stdout.write(f'Results written to {options["output"]}')
+        if options['compare']:
+            self._compare(results, options)
@@ -0,0 +1,65 @@
+"""
+Django command to time the assigned_only tag filter as recipes grow.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.benchmarking import add_plan_arguments, write_plan
+from core.datagen import DatasetGenerator
+from core.models import Tag
+
+
+class Command(BaseCommand):
+    """Seed throwaway datasets and time listing the assigned tags."""
+    help = (
+        'Compare the legacy join + DISTINCT assigned_only filter with the '
+        'EXISTS semi-join for users with more and more recipes. All seeded '
+        'data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='Numbers of recipes of each seeded user.',
+        )
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--tags-per-recipe', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        add_plan_arguments(parser)
+
+    def _seed(self, recipes, options):
+        """Create a user with tagged recipes and return it."""
+        return DatasetGenerator(
+            seed=options['seed'],
+            recipes=recipes,
+            tags=options['tags'],
+            ingredients=0,
+            tags_per_recipe=options['tags_per_recipe'],
+            email_prefix=f'benchmark-assigned-{recipes}',
+        ).generate()[0]
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if min(options['recipes']) < 1:
+            raise CommandError('--recipes must be at least 1.')
+
+        with transaction.atomic():
+            for recipes in options['recipes']:
+                tags = Tag.objects.filter(user=self._seed(recipes, options))
+                plans = {
+                    'join + distinct (legacy)': tags.filter(
+                        recipe__isnull=False,
+                    ).order_by('-name').distinct(),
+                    'exists': tags.assigned().order_by('-name'),
+                }
+
+                for name, queryset in plans.items():
+                    write_plan(
+                        self.stdout, f'{recipes} recipes, {name}', queryset,
+                        options,
+                    )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,279 @@
+"""
+Django command to compare sync WSGI and async ASGI throughput.
+"""
+import asyncio
+import importlib
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+from django.urls import clear_url_caches, reverse
+from rest_framework.authtoken.models import Token
+
+from core.benchmarking import BENCHMARK_CACHES
+from core.datagen import DatasetGenerator
+from core.metrics import percentile
+
+
+MODES = ['wsgi', 'asgi-sync', 'asgi-async']
+
+
+class Command(BaseCommand):
+    """Serve the same requests from WSGI threads and an ASGI event loop."""
+    help = (
+        'Compare the throughput of the recipe read endpoints served by '
+        'a pool of WSGI threads, and by one ASGI event loop with the sync '
+        'and the async views. Clients read responses slowly (--client-'
+        'delay), which holds a WSGI thread but not the event loop. Lists '
+        'are not cached, and requests use a private in-memory cache. The '
+        'seeded data is committed and deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Clients sending requests at the same time.',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='WSGI worker threads.',
+        )
+        parser.add_argument(
+            '--client-delay',
+            type=float,
+            default=50,
+            help='Milliseconds each client takes to read a response.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            choices=MODES,
+            default=MODES,
+        )
+
+    @contextmanager
+    def _mode(self, mode):
+        """Route reads to the views of a mode and set up connections."""
+        db = connections.settings[DEFAULT_DB_ALIAS]
+        max_age = db['CONN_MAX_AGE']
+        # ASGI requests run on short lived threads, so connections are
+        # not kept unless they are pooled.
+        if mode != 'wsgi' and 'pool' not in db['OPTIONS']:
+            db['CONN_MAX_AGE'] = 0
+        try:
+            with override_settings(ASYNC_READ_VIEWS=mode == 'asgi-async'):
+                self._reload_urls()
+                yield
+        finally:
+            db['CONN_MAX_AGE'] = max_age
+            self._reload_urls()
+
+    def _reload_urls(self):
+        importlib.reload(importlib.import_module('recipe.urls'))
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    def _paths(self, recipe_ids, count):
+        """Return (path, query string) pairs, lists and details mixed."""
+        list_path = reverse('recipe:recipe-list')
+        paths = []
+        for i in range(count):
+            if i % 2:
+                recipe_id = recipe_ids[i * 7919 % len(recipe_ids)]
+                paths.append((
+                    reverse('recipe:recipe-detail', args=[recipe_id]), '',
+                ))
+            else:
+                paths.append((list_path, urlencode({'page_size': 20})))
+
+        return paths
+
+    def _run_wsgi(self, paths, token, options):
+        handler = WSGIHandler()
+        delay = options['client_delay'] / 1000
+        pending = queue.SimpleQueue()
+        for path in paths:
+            pending.put(path)
+        timings, errors = [], []
+
+        def start_response(status, headers, exc_info=None):
+            if not status.startswith('200'):
+                errors.append(status)
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        path, query = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    start = time.perf_counter()
+                    environ = {
+                        'REQUEST_METHOD': 'GET',
+                        'PATH_INFO': path,
+                        'QUERY_STRING': query,
+                        'HTTP_AUTHORIZATION': f'Token {token}',
+                        'wsgi.input': BytesIO(),
+                    }
+                    setup_testing_defaults(environ)
+                    response = handler(environ, start_response)
+                    b''.join(response)
+                    # The thread is busy until the client has read it all.
+                    time.sleep(delay)
+                    response.close()
+                    timings.append((time.perf_counter() - start) * 1000)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker)
+            for _ in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return timings, errors
+
+    async def _asgi_request(self, app, path, query, token, delay):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [
+                (b'host', b'127.0.0.1'),
+                (b'authorization', f'Token {token}'.encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('127.0.0.1', 80),
+        }
+        received = False
+        disconnected = asyncio.Event()
+        response_status = None
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b''}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal response_status
+            if message['type'] == 'http.response.start':
+                response_status = message['status']
+            elif not message.get('more_body'):
+                # Waiting on the client does not block other requests.
+                await asyncio.sleep(delay)
+
+        try:
+            await app(scope, receive, send)
+        finally:
+            disconnected.set()
+
+        return response_status
+
+    def _run_asgi(self, paths, token, options):
+        app = ASGIHandler()
+        delay = options['client_delay'] / 1000
+        timings, errors = [], []
+
+        async def client(client_paths):
+            for path, query in client_paths:
+                start = time.perf_counter()
+                status = await self._asgi_request(
+                    app, path, query, token, delay,
+                )
+                if status != 200:
+                    errors.append(str(status))
+                timings.append((time.perf_counter() - start) * 1000)
+
+        async def main():
+            concurrency = options['concurrency']
+            await asyncio.gather(*(
+                client(paths[i::concurrency]) for i in range(concurrency)
+            ))
+
+        asyncio.run(main())
+        return timings, errors
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        for name in ('requests', 'concurrency', 'threads'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be at least 1.')
+
+        # Lists are not cached, otherwise all but the first list request
+        # would be served from the cache instead of the view.
+        with override_settings(CACHES=BENCHMARK_CACHES,
+                               RECIPE_LIST_CACHE_TIMEOUT=0):
+            self._benchmark(options)
+
+    def _benchmark(self, options):
+        """Seed the data, run every mode and delete the data again."""
+        generator = DatasetGenerator(
+            seed=options['seed'],
+            recipes=options['recipes'],
+            email_prefix='benchmark-concurrency',
+        )
+        users = generator.generate()
+        try:
+            user = users[0]
+            token = Token.objects.create(user=user).key
+            paths = self._paths(
+                generator.recipe_ids[user.id], options['requests'],
+            )
+
+            with override_settings(ALLOWED_HOSTS=['127.0.0.1']):
+                for mode in options['modes']:
+                    # Every mode starts from a cold (private) cache.
+                    cache.clear()
+                    with self._mode(mode):
+                        run = (
+                            self._run_wsgi if mode == 'wsgi'
+                            else self._run_asgi
+                        )
+                        start = time.perf_counter()
+                        timings, errors = run(paths, token, options)
+                        elapsed = time.perf_counter() - start
+                    if errors:
+                        raise CommandError(
+                            f'{mode}: {len(errors)} failed requests, '
+                            f'first {errors[0]}'
+                        )
+                    self.stdout.write(
+                        f'{mode}: {len(timings)} requests, '
+                        f'{len(timings) / elapsed:.0f} req/s, '
+                        f'p50 {percentile(timings, 50):.2f} ms, '
+                        f'p99 {percentile(timings, 99):.2f} ms'
+                    )
+        finally:
+            for user in users:
+                user.delete()
+            cache.clear()
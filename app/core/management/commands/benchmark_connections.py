@@ -0,0 +1,205 @@
+"""
+Django command to load test the API with and without reused connections.
+"""
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.benchmarking import BENCHMARK_CACHES
+from core.datagen import DatasetGenerator
+from core.metrics import percentile
+
+
+MODES = ['per-request', 'persistent', 'pooled']
+
+
+class Command(BaseCommand):
+    """Serve requests from worker threads and compare connection modes."""
+    help = (
+        'Load test the recipe detail endpoint from a pool of worker '
+        'threads calling the WSGI handler: opening a connection per '
+        'request, keeping one per thread (CONN_MAX_AGE) and checking them '
+        'out of a psycopg pool (the DB_POOL settings, or one connection '
+        'per worker). The seeded data is committed, as the workers use '
+        'their own connections, and deleted afterwards. Requests use a '
+        'private in-memory cache, never the configured one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            choices=MODES,
+            default=MODES,
+        )
+
+    @contextmanager
+    def _connection_settings(self, mode, concurrency):
+        """Apply the settings of a mode to connections opened meanwhile."""
+        if mode == 'pooled' and not is_psycopg3:
+            raise CommandError('The pooled mode needs psycopg[pool].')
+        db = connections.settings[DEFAULT_DB_ALIAS]
+        saved = {key: db[key] for key in ('CONN_MAX_AGE', 'OPTIONS')}
+        pool = saved['OPTIONS'].get('pool')
+        db['OPTIONS'] = {
+            key: value for key, value in db['OPTIONS'].items()
+            if key != 'pool'
+        }
+        if mode == 'per-request':
+            db['CONN_MAX_AGE'] = 0
+        elif mode == 'persistent':
+            db['CONN_MAX_AGE'] = saved['CONN_MAX_AGE'] or 60
+        else:
+            db['CONN_MAX_AGE'] = 0
+            db['OPTIONS']['pool'] = pool or {
+                'min_size': 1, 'max_size': concurrency,
+            }
+        try:
+            yield
+        finally:
+            if mode == 'pooled':
+                # A pool is kept per alias, it must not outlive the mode.
+                connections[DEFAULT_DB_ALIAS].close_pool()
+            db.update(saved)
+
+    def _environ(self, path, token):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'HTTP_AUTHORIZATION': f'Token {token}',
+            'wsgi.input': BytesIO(),
+        }
+        setup_testing_defaults(environ)
+        return environ
+
+    def _worker(self, handler, paths, token, timings, errors):
+        """Send requests the way one thread of a WSGI server would."""
+        def start_response(status, headers, exc_info=None):
+            if not status.startswith('200'):
+                errors.append(status)
+
+        try:
+            for path in paths:
+                start = time.perf_counter()
+                response = handler(self._environ(path, token), start_response)
+                b''.join(response)
+                # Closing the response fires request_finished, which is
+                # when Django closes connections that are not reused.
+                response.close()
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+
+    def _run(self, mode, paths, token, concurrency):
+        """Serve all paths in a mode and return the results."""
+        handler = WSGIHandler()
+        timings, errors, opened = [], [], []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        # Every mode starts from a cold (private) cache.
+        cache.clear()
+        connection_created.connect(count)
+        try:
+            with self._connection_settings(mode, concurrency):
+                workers = [
+                    threading.Thread(
+                        target=self._worker,
+                        args=(handler, paths[i::concurrency], token,
+                              timings, errors),
+                    )
+                    for i in range(concurrency)
+                ]
+                start = time.perf_counter()
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                elapsed = time.perf_counter() - start
+                connections_opened = len(opened)
+                if mode == 'pooled':
+                    # Requests only check out the connections the pool
+                    # opened.
+                    stats = connections[DEFAULT_DB_ALIAS].pool.get_stats()
+                    connections_opened = stats.get('connections_num', 0)
+        finally:
+            connection_created.disconnect(count)
+
+        if errors:
+            raise CommandError(f'{mode}: {len(errors)} failed requests, '
+                               f'first {errors[0]}')
+
+        return {
+            'requests': len(timings),
+            'connections': connections_opened,
+            'rps': len(timings) / elapsed,
+            'mean_ms': statistics.fmean(timings),
+            'p50_ms': percentile(timings, 50),
+            'p99_ms': percentile(timings, 99),
+        }
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError(
+                '--requests and --concurrency must be at least 1.'
+            )
+
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            self._benchmark(options)
+
+    def _benchmark(self, options):
+        """Seed the data, run every mode and delete the data again."""
+        generator = DatasetGenerator(
+            seed=options['seed'],
+            recipes=options['recipes'],
+            email_prefix='benchmark-connections',
+        )
+        users = generator.generate()
+        try:
+            user = users[0]
+            token = Token.objects.create(user=user).key
+            recipe_ids = generator.recipe_ids[user.id]
+            paths = [
+                reverse(
+                    'recipe:recipe-detail',
+                    args=[recipe_ids[i * 7919 % len(recipe_ids)]],
+                )
+                for i in range(options['requests'])
+            ]
+
+            with override_settings(ALLOWED_HOSTS=['127.0.0.1']):
+                for mode in options['modes']:
+                    result = self._run(
+                        mode, paths, token, options['concurrency'],
+                    )
+                    self.stdout.write(
+                        f'{mode}: {result["requests"]} requests, '
+                        f'{result["connections"]} connections opened, '
+                        f'{result["rps"]:.0f} req/s, '
+                        f'mean {result["mean_ms"]:.2f} ms, '
+                        f'p50 {result["p50_ms"]:.2f} ms, '
+                        f'p99 {result["p99_ms"]:.2f} ms'
+                    )
+        finally:
+            for user in users:
+                user.delete()
+            cache.clear()
@@ -0,0 +1,64 @@
+"""
+Django command to compare query plans for filtering recipes by tags.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.benchmarking import add_plan_arguments, write_plan
+from core.datagen import DatasetGenerator
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Seed a throwaway dataset and time the recipe tag filters."""
+    help = (
+        'Compare the legacy join + DISTINCT tag filter with the EXISTS '
+        'based filters. All seeded data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=5)
+        parser.add_argument('--filter-tags', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        add_plan_arguments(parser)
+
+    def _seed(self, options):
+        """Create a user with tagged recipes and return it with its tags."""
+        generator = DatasetGenerator(
+            seed=options['seed'],
+            recipes=options['recipes'],
+            tags=options['tags'],
+            ingredients=0,
+            tags_per_recipe=options['tags_per_recipe'],
+            email_prefix='benchmark-filters',
+        )
+        user = generator.generate()[0]
+
+        return user, generator.tags[user.id]
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with transaction.atomic():
+            user, tags = self._seed(options)
+            tag_ids = [
+                tag.id for tag in tags[:max(options['filter_tags'], 1)]
+            ]
+            recipes = Recipe.objects.filter(user=user)
+            plans = {
+                'join + distinct (legacy)': recipes.filter(
+                    tags__id__in=tag_ids,
+                ).order_by('-id').distinct(),
+                'exists (match=any)': recipes.with_tags(
+                    tag_ids,
+                ).order_by('-id'),
+                'group by (match=all)': recipes.with_tags(
+                    tag_ids, match_all=True,
+                ).order_by('-id'),
+            }
+
+            for name, queryset in plans.items():
+                write_plan(self.stdout, name, queryset, options)
+
+            transaction.set_rollback(True)
@@ -0,0 +1,101 @@
+"""
+Django command to compare the recipe list serializers.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from core.datagen import DatasetGenerator
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import RecipeSerializer, RecipeValuesSerializer
+
+
+class Command(BaseCommand):
+    """Seed a throwaway dataset and time rendering recipe lists."""
+    help = (
+        'Compare RecipeSerializer with the .values() fast path used by '
+        'the recipe list. All seeded data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Numbers of recipes to render.',
+        )
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--attrs-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _seed(self, options):
+        """Create a user with tagged recipes and return it."""
+        return DatasetGenerator(
+            seed=options['seed'],
+            recipes=max(options['rows']),
+            tags=options['tags'],
+            ingredients=options['tags'],
+            tags_per_recipe=options['attrs_per_recipe'],
+            ingredients_per_recipe=options['attrs_per_recipe'],
+            email_prefix='benchmark-serializers',
+        ).generate()[0]
+
+    def _time(self, render, repeat):
+        """Return the median wall time in ms of a render."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        renderer = JSONRenderer()
+
+        with transaction.atomic():
+            user = self._seed(options)
+            recipes = Recipe.objects.filter(user=user).order_by('-id')
+            for rows in options['rows']:
+                instances = recipes.prefetch_related(
+                    Prefetch('tags', queryset=Tag.objects.order_by('id')),
+                    Prefetch(
+                        'ingredients',
+                        queryset=Ingredient.objects.order_by('id'),
+                    ),
+                )[:rows]
+                values = recipes.values(
+                    'id', 'title', 'time_minutes', 'price', 'link',
+                )[:rows]
+                paths = {
+                    'RecipeSerializer': lambda: renderer.render(
+                        RecipeSerializer(instances.all(), many=True).data
+                    ),
+                    'RecipeValuesSerializer': lambda: renderer.render(
+                        RecipeValuesSerializer(values.all()).data
+                    ),
+                }
+
+                timings = {}
+                for name, render in paths.items():
+                    ms = self._time(render, options['repeat'])
+                    timings[name] = ms
+                    self.stdout.write(
+                        f'{rows} rows, {name}: median {ms:.2f} ms '
+                        f'({rows / ms * 1000:.0f} rows/s)'
+                    )
+                speedup = (
+                    timings['RecipeSerializer'] /
+                    timings['RecipeValuesSerializer']
+                )
+                self.stdout.write(f'{rows} rows, speedup {speedup:.1f}x')
+                self.stdout.write('')
+
+            transaction.set_rollback(True)
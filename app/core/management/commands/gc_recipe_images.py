@@ -0,0 +1,80 @@
+"""
+Django command to delete recipe image files no recipe references.
+"""
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Recipe
+
+
+IMAGE_DIRS = [
+    os.path.join('uploads', 'recipe'),
+    os.path.join('uploads', 'recipe', 'variants'),
+    os.path.join('uploads', 'tmp'),
+]
+
+
+class Command(BaseCommand):
+    """Garbage collect orphaned recipe images and their variants."""
+    help = (
+        'Delete files under MEDIA_ROOT/uploads/recipe (and leftover '
+        'upload temp files) that no recipe references.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Only delete files older than this many seconds, so '
+                 'uploads still in progress are kept.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the files that would be deleted.',
+        )
+
+    def _referenced(self):
+        """Return the names of every image and variant still in use."""
+        names = set()
+        rows = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True,
+        ).values_list('image', 'image_variants')
+        for image, variants in rows.iterator(chunk_size=2000):
+            names.add(image)
+            for formats in variants.values():
+                names.update(formats.values())
+
+        return names
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        storage = Recipe._meta.get_field('image').storage
+        referenced = self._referenced()
+        cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+        removed = 0
+        freed = 0
+
+        for directory in IMAGE_DIRS:
+            if not storage.exists(directory):
+                continue
+            for file_name in storage.listdir(directory)[1]:
+                name = os.path.join(directory, file_name)
+                if (name in referenced or
+                        storage.get_modified_time(name) > cutoff):
+                    continue
+                removed += 1
+                freed += storage.size(name)
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    storage.delete(name)
+
+        action = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {removed} orphaned files ({freed} bytes).'
+        ))
@@ -0,0 +1,211 @@
+"""
+Django command to import recipes from NDJSON or CSV.
+"""
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import bump_cache_version
+from recipe.export import CSV_LIST_SEPARATOR, iter_chunks
+
+
+RECIPE_FIELDS = ['title', 'time_minutes', 'price', 'link', 'description']
+RELATED_FIELDS = [('tags', Tag), ('ingredients', Ingredient)]
+
+
+class Command(BaseCommand):
+    """Import recipes for a user in batches."""
+    help = (
+        'Import recipes from NDJSON or CSV, in the format written by the '
+        'recipe export, for one user. Each batch is committed on its own.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file',
+            help='File to read, or - to read from stdin.',
+        )
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Email of the user the recipes are imported for.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            help='Input format. Guessed from the file extension when not '
+                 'given, NDJSON for stdin.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def _read_records(self, stream, input_format):
+        """Yield (line number, record) for every recipe in the input."""
+        if input_format == 'csv':
+            reader = csv.DictReader(stream)
+            for record in reader:
+                yield reader.line_num, record
+            return
+
+        for line_num, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except ValueError as exc:
+                raise CommandError(f'line {line_num}: {exc}')
+
+    def _error(self, line_num, name, error):
+        messages = getattr(error, 'messages', [str(error)])
+        return CommandError(f'line {line_num}: {name}: {" ".join(messages)}')
+
+    def _clean(self, line_num, record):
+        """Return the validated field values and related names of a record."""
+        values = {}
+        for name in RECIPE_FIELDS:
+            field = Recipe._meta.get_field(name)
+            value = record.get(name)
+            if value in (None, ''):
+                if not field.blank:
+                    raise self._error(
+                        line_num, name, 'This field is required.',
+                    )
+                value = ''
+            try:
+                values[name] = field.clean(value, None)
+            except ValidationError as exc:
+                raise self._error(line_num, name, exc)
+
+        related = {}
+        for name, model in RELATED_FIELDS:
+            items = record.get(name) or []
+            if isinstance(items, str):
+                items = items.split(CSV_LIST_SEPARATOR)
+            names = []
+            for item in items:
+                if isinstance(item, dict):
+                    item = item.get('name')
+                item = str(item or '').strip()
+                if not item:
+                    continue
+                try:
+                    model._meta.get_field('name').clean(item, None)
+                except ValidationError as exc:
+                    raise self._error(line_num, name, exc)
+                names.append(item)
+            related[name] = list(dict.fromkeys(names))
+
+        return values, related
+
+    def _link(self, name, pairs):
+        """Insert (recipe id, tag or ingredient id) rows into a link table.
+
+        The ids are sent as two arrays in one statement, which is much
+        cheaper than building a model instance per link. Recipe counts
+        are then adjusted in one more statement.
+        """
+        if not pairs:
+            return
+        field = Recipe._meta.get_field(name)
+        through = field.remote_field.through
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {qn(through._meta.db_table)} '
+                f'({qn(field.m2m_column_name())}, '
+                f'{qn(field.m2m_reverse_name())}) '
+                f'SELECT * FROM unnest(%s::bigint[], %s::bigint[])',
+                [list(ids) for ids in zip(*pairs)],
+            )
+        field.related_model.objects.adjust_recipe_counts(
+            Counter(attr_id for _recipe_id, attr_id in pairs),
+        )
+
+    def _import_batch(self, user, batch, name_ids):
+        """Write one batch of records with a few bulk queries."""
+        cleaned = [self._clean(line_num, record) for line_num, record in batch]
+
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create([
+                Recipe(user=user, **values) for values, _related in cleaned
+            ])
+            for name, model in RELATED_FIELDS:
+                ids = name_ids[name]
+                missing = list(dict.fromkeys(
+                    attr
+                    for _values, related in cleaned
+                    for attr in related[name] if attr not in ids
+                ))
+                if missing:
+                    created = model.objects.bulk_create(
+                        [model(user=user, name=attr) for attr in missing],
+                        update_conflicts=True,
+                        unique_fields=['user', 'name'],
+                        update_fields=['name'],
+                    )
+                    ids.update((obj.name, obj.id) for obj in created)
+                self._link(name, [
+                    (recipe.id, ids[attr])
+                    for recipe, (_values, related) in zip(recipes, cleaned)
+                    for attr in related[name]
+                ])
+            Recipe.objects.filter(
+                id__in=[recipe.id for recipe in recipes],
+            ).update_search_vector()
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        path = options['file']
+        input_format = options['format']
+        if input_format is None:
+            ext = os.path.splitext(path)[1].lower()
+            input_format = 'csv' if ext == '.csv' else 'ndjson'
+        if path == '-':
+            stream = sys.stdin
+        else:
+            stream = open(path, newline='', encoding='utf-8')
+
+        # Names are resolved to ids in memory, so only new names hit the
+        # database.
+        name_ids = {
+            name: dict(model.objects.filter(user=user).values_list(
+                'name', 'id',
+            ))
+            for name, model in RELATED_FIELDS
+        }
+        imported = 0
+        start = time.perf_counter()
+        try:
+            for batch in iter_chunks(
+                    self._read_records(stream, input_format),
+                    options['batch_size']):
+                self._import_batch(user, batch, name_ids)
+                imported += len(batch)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{imported} recipes imported')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if imported:
+                bump_cache_version(user.id)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes in {elapsed:.1f}s '
+            f'({imported / max(elapsed, 1e-9):.0f} rows/s).'
+        ))
@@ -0,0 +1,52 @@
+"""
+Django command to recount the recipes using each tag and ingredient.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Tag, Ingredient
+from recipe.cache import bump_cache_version
+
+
+class Command(BaseCommand):
+    """Rebuild the recipe counts of tags and ingredients."""
+    help = (
+        'Recount the recipes using each tag and ingredient from the link '
+        'tables, with one update per table, and fix the counts that are '
+        'off. Use after writing links outside of the API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email of the only user to rebuild the counts for.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        users = {}
+        if options['user'] is not None:
+            try:
+                users['user'] = get_user_model().objects.get(
+                    email=options['user'],
+                )
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'User {options["user"]} does not exist.')
+
+        user_ids = set()
+        with transaction.atomic():
+            for model in (Tag, Ingredient):
+                fixed, changed = model.objects.filter(
+                    **users,
+                ).rebuild_recipe_counts()
+                user_ids |= changed
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural}: {fixed} fixed'
+                )
+        for user_id in user_ids:
+            bump_cache_version(user_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt recipe counts for {len(user_ids)} users.'
+        ))
@@ -0,0 +1,165 @@
+"""
+Per-request timings and query counts, aggregated per view.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_current_timer = ContextVar('request_timer', default=None)
+
+
+def percentile(timings, pct):
+    """Return the nearest rank percentile of a list of timings."""
+    ordered = sorted(timings)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Histogram:
+    """Count observations into cumulative `le` buckets."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def as_dict(self):
+        buckets, total = {}, 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            buckets[str(bound)] = total
+
+        return {'count': total, 'sum': round(self.sum, 3), 'buckets': buckets}
+
+
+class RequestTimer:
+    """Time one request and count the queries it runs.
+
+    Queries are counted while the timer is active in the current
+    context, which sync_to_async carries over to the threads the async
+    ORM runs in. Serializer time is the time spent from the start of
+    the view to the rendered response outside of the database, which
+    for these APIs is almost all serialization.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_start = None
+        self.db_time_at_view = 0.0
+        self.end = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def activate(self):
+        """Count the queries run in this context until deactivated."""
+        return _current_timer.set(self)
+
+    def deactivate(self, token):
+        _current_timer.reset(token)
+
+    def view_started(self):
+        self.view_start = time.perf_counter()
+        self.db_time_at_view = self.db_time
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    @property
+    def total_ms(self):
+        return (self.end - self.start) * 1000
+
+    @property
+    def db_ms(self):
+        return self.db_time * 1000
+
+    @property
+    def serialize_ms(self):
+        if self.view_start is None:
+            return 0.0
+        view_db_time = self.db_time - self.db_time_at_view
+        return max(0.0, self.end - self.view_start - view_db_time) * 1000
+
+    def server_timing(self):
+        """Return the value of a Server-Timing header for the request."""
+        return (
+            f'db;dur={self.db_ms:.2f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serialize_ms:.2f}, '
+            f'total;dur={self.total_ms:.2f}'
+        )
+
+
+def time_queries(execute, sql, params, many, context):
+    """Execute wrapper passing queries to the active timer, if any."""
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """Add time_queries to a new connection, under any other wrappers."""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_queries)
+
+
+class MetricsRegistry:
+    """Histograms of request timings per view, kept in process memory.
+
+    Every worker process keeps its own registry, so a scraper sees the
+    requests served by the process that answered it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def _histograms(self):
+        return {
+            'total_ms': Histogram(DURATION_BUCKETS_MS),
+            'db_ms': Histogram(DURATION_BUCKETS_MS),
+            'serialize_ms': Histogram(DURATION_BUCKETS_MS),
+            'queries': Histogram(QUERY_BUCKETS),
+        }
+
+    def record(self, view, timer):
+        with self._lock:
+            histograms = self._views.get(view)
+            if histograms is None:
+                histograms = self._views[view] = self._histograms()
+            for name, histogram in histograms.items():
+                histogram.observe(getattr(timer, name))
+
+    def snapshot(self):
+        """Return the histograms of every view as plain data."""
+        with self._lock:
+            return {
+                view: {
+                    name: histogram.as_dict()
+                    for name, histogram in histograms.items()
+                }
+                for view, histograms in sorted(self._views.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,74 @@
+"""
+Middleware for the APIs.
+"""
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core.metrics import RequestTimer, registry
+
+
+class RequestMetricsMiddleware:
+    """Record query counts and timings for a sample of requests.
+
+    A sampled request gets a Server-Timing header with its database,
+    serializer and total time, and is added to the per view histograms
+    served by the metrics endpoint. Requests that are not sampled only
+    pay for one random number, and nothing at all with a sample rate
+    of 0. Works under WSGI and ASGI alike.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def _record(self, request, response, timer):
+        timer.finish()
+        response['Server-Timing'] = timer.server_timing()
+        match = request.resolver_match
+        if match is not None:
+            registry.record(f'{request.method} {match.view_name}', timer)
+
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        timer = request._metrics_timer = RequestTimer()
+        token = timer.activate()
+        try:
+            response = self.get_response(request)
+        finally:
+            timer.deactivate(token)
+
+        return self._record(request, response, timer)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        timer = request._metrics_timer = RequestTimer()
+        token = timer.activate()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timer.deactivate(token)
+
+        return self._record(request, response, timer)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timer = getattr(request, '_metrics_timer', None)
+        if timer is not None:
+            timer.view_started()
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:26
+
+from django.db import migrations, models
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags and ingredients sharing a user and name into one row."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = Recipe._meta.get_field(field_name).remote_field.through
+        fk = f'{model_name.lower()}_id'
+        dupes = model.objects.values('user_id', 'name').annotate(
+            keep=models.Min('id'),
+            total=models.Count('id'),
+        ).filter(total__gt=1)
+        for dupe in dupes:
+            extra = list(model.objects.filter(
+                user_id=dupe['user_id'],
+                name=dupe['name'],
+            ).exclude(id=dupe['keep']).values_list('id', flat=True))
+            linked = set(through.objects.filter(
+                **{f'{fk}__in': extra}
+            ).values_list('recipe_id', flat=True))
+            linked -= set(through.objects.filter(
+                **{fk: dupe['keep']}
+            ).values_list('recipe_id', flat=True))
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{fk: dupe['keep']})
+                for recipe_id in linked
+            ])
+            model.objects.filter(id__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:58
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(models.F('user'), django.db.models.functions.comparison.Collate(django.db.models.functions.text.Upper('name'), 'C'), name='ingredient_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(models.F('user'), django.db.models.functions.comparison.Collate(django.db.models.functions.text.Upper('name'), 'C'), name='tag_name_prefix_idx'),
+        ),
+    ]
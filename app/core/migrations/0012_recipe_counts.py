@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:56
+
+from django.db import migrations, models
+
+
+BACKFILL_RECIPE_COUNTS = """
+UPDATE core_tag t SET recipe_count = (
+    SELECT count(*) FROM core_recipe_tags rt WHERE rt.tag_id = t.id
+);
+UPDATE core_ingredient i SET recipe_count = (
+    SELECT count(*) FROM core_recipe_ingredients ri
+    WHERE ri.ingredient_id = i.id
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        # Fill the counts before indexing them.
+        migrations.RunSQL(BACKFILL_RECIPE_COUNTS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count', 'name'], name='ingredient_usage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count', 'name'], name='tag_usage_idx'),
+        ),
+    ]
@@ -1,9 +1,17 @@
 """
 Custom User models.
 """
-import uuid
 import os
-from django.db import models
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
+from django.db import models, router, transaction
+from django.db.models.functions import Cast, Coalesce, Collate, Upper
 from django.contrib.auth.models import (
     BaseUserManager,
     AbstractBaseUser,
@@ -11,13 +19,17 @@ from django.contrib.auth.models import (
 )
 from django.conf import settings
 
+from core.storage import ContentAddressedStorage
+
 
 def recipe_image_file_path(instance, file_name):
-    """Generate File path for new recipe image."""
-    ext = os.path.splitext(file_name)[1]
-    filename = f'{uuid.uuid4()}{ext}'
+    """Generate File path for new recipe image.
 
-    return os.path.join('uploads', 'recipe', filename)
+    The storage swaps the file name for a hash of the image content.
+    """
+    ext = os.path.splitext(file_name)[1].lower()
+
+    return os.path.join('uploads', 'recipe', f'image{ext}')
 
 
 class UserManager(BaseUserManager):
@@ -62,6 +74,109 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.email
 
 
+SEARCH_CONFIG = 'english'
+
+
+def _names_subquery(model):
+    """Space separated names of a recipe's tags or ingredients."""
+    return models.Subquery(
+        model.objects.filter(
+            recipe=models.OuterRef('pk'),
+        ).values('recipe').annotate(
+            names=StringAgg('name', delimiter=' '),
+        ).values('names')
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Queryset for recipes."""
+
+    def update_search_vector(self):
+        """Recompute the stored search vector of the recipes in one query.
+
+        Titles weigh most, then descriptions, then tag and ingredient
+        names.
+        """
+        return self.update(search_vector=(
+            SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+            SearchVector('description', weight='B', config=SEARCH_CONFIG) +
+            SearchVector(
+                _names_subquery(Tag), weight='C', config=SEARCH_CONFIG,
+            ) +
+            SearchVector(
+                _names_subquery(Ingredient), weight='C',
+                config=SEARCH_CONFIG,
+            )
+        ))
+
+    def release_recipe_counts(self):
+        """Take these recipes off the counts of their tags and ingredients.
+
+        The decrements are grouped from the link tables, so this costs
+        the same few queries for any number of recipes.
+        """
+        for model in (Tag, Ingredient):
+            attrs = model.objects.using(self.db)
+            through, field = attrs.all()._links()
+            links = through.objects.using(self.db).filter(
+                recipe_id__in=self.values('pk'),
+            ).values(field).annotate(n=models.Count('pk'))
+            attrs.adjust_recipe_counts(
+                {row[field]: -row['n'] for row in links}
+            )
+
+    def delete(self):
+        """Delete the recipes, releasing their recipe counts first."""
+        db = router.db_for_write(self.model)
+        with transaction.atomic(using=db, savepoint=False):
+            self.using(db).release_recipe_counts()
+            return super().delete()
+
+    def search(self, text):
+        """Recipes matching a web style search, best matches first."""
+        query = SearchQuery(text, search_type='websearch',
+                            config=SEARCH_CONFIG)
+        # Cast the real returned by ts_rank to a double so it compares
+        # exactly with the rank kept in pagination cursors.
+        return self.filter(search_vector=query).annotate(
+            rank=Cast(
+                SearchRank(models.F('search_vector'), query),
+                models.FloatField(),
+            ),
+        ).order_by('-rank', '-id')
+
+    def _filter_related(self, through, field, ids, match_all):
+        """Filter recipes by rows in an M2M through table.
+
+        Uses semi-join subqueries so recipes are never duplicated and
+        no DISTINCT is needed.
+        """
+        ids = set(ids)
+        links = through.objects.filter(**{f'{field}_id__in': ids})
+        if match_all:
+            matched = links.values('recipe_id').annotate(
+                matches=models.Count(field),
+            ).filter(matches=len(ids)).values('recipe_id')
+            return self.filter(id__in=matched)
+
+        return self.filter(
+            models.Exists(links.filter(recipe_id=models.OuterRef('pk')))
+        )
+
+    def with_tags(self, tag_ids, match_all=False):
+        """Recipes having any (or all) of the given tags."""
+        return self._filter_related(
+            self.model.tags.through, 'tag', tag_ids, match_all,
+        )
+
+    def with_ingredients(self, ingredient_ids, match_all=False):
+        """Recipes having any (or all) of the given ingredients."""
+        return self._filter_related(
+            self.model.ingredients.through, 'ingredient', ingredient_ids,
+            match_all,
+        )
+
+
 class Recipe(models.Model):
     """Recipe Object."""
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
@@ -73,31 +188,228 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=ContentAddressedStorage(),
+    )
+    image_variants = models.JSONField(default=dict, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+            GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def delete(self, *args, **kwargs):
+        """Delete the recipe, releasing its recipe counts first."""
+        db = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self,
+        )
+        with transaction.atomic(using=db, savepoint=False):
+            Recipe.objects.using(db).filter(
+                pk=self.pk,
+            ).release_recipe_counts()
+            return super().delete(*args, **kwargs)
+
+
+def _name_key():
+    """Upper cased name compared byte by byte, as the prefix indexes are."""
+    return Collate(Upper('name'), 'C')
 
-class Tag(models.Model):
+
+class RecipeAttrQuerySet(models.QuerySet):
+    """Queryset for tags and ingredients."""
+
+    def autocomplete(self, prefix):
+        """Return names starting with prefix, ignoring case, A to Z.
+
+        The filter and the ordering both match the (user, upper(name))
+        index, so the first rows are read straight off the index. The
+        prefix is upper cased by the database too, as Python's upper()
+        differs for some letters (ß becomes SS).
+        """
+        return self.alias(
+            name_key=_name_key(),
+        ).filter(
+            name_key__startswith=Upper(models.Value(prefix)),
+        ).order_by('name_key', 'name')
+
+    def assigned(self):
+        """Rows linked to at least one recipe.
+
+        A semi-join on the link table's index by row id: each row stops
+        at its first link, so none is repeated and no DISTINCT is needed.
+        """
+        through, field = self._links()
+        return self.filter(models.Exists(
+            through.objects.filter(**{field: models.OuterRef('pk')})
+        ))
+
+    def by_usage(self):
+        """Most used first, then A to Z."""
+        return self.order_by('-recipe_count', 'name')
+
+    def _links(self):
+        """Return the recipe link table and its column for this model."""
+        return (
+            self.model._meta.get_field('recipe').through,
+            self.model._meta.model_name,
+        )
+
+    def linked_recipes(self):
+        """Return the recipes linking these rows, fetched in one query."""
+        through, field = self._links()
+        recipe_ids = through.objects.using(self.db).filter(
+            **{f'{field}_id__in': self.values('pk')},
+        ).values_list('recipe_id', flat=True).distinct()
+
+        return Recipe.objects.using(self.db).filter(pk__in=list(recipe_ids))
+
+    def delete(self):
+        """Delete the rows, then refresh the search vectors of their recipes.
+
+        The recipes are collected and updated in one query each, for any
+        number of rows.
+        """
+        db = router.db_for_write(self.model)
+        with transaction.atomic(using=db, savepoint=False):
+            recipes = self.using(db).linked_recipes()
+            deleted = super().delete()
+            recipes.update_search_vector()
+            return deleted
+
+    def adjust_recipe_counts(self, deltas):
+        """Add {id: change} to the recipe counts in one query."""
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not deltas:
+            return 0
+
+        return self.filter(pk__in=deltas).update(
+            recipe_count=models.F('recipe_count') + models.Case(
+                *[
+                    models.When(pk=pk, then=models.Value(delta))
+                    for pk, delta in deltas.items()
+                ],
+                output_field=models.IntegerField(),
+            ),
+        )
+
+    def rebuild_recipe_counts(self):
+        """Recount the recipes using each row from the link table.
+
+        Only rows whose count was off are written. Returns the number of
+        rows fixed and the ids of the users owning them.
+        """
+        through, field = self._links()
+        actual = Coalesce(
+            models.Subquery(
+                through.objects.filter(
+                    **{field: models.OuterRef('pk')},
+                ).values(field).annotate(
+                    n=models.Count('pk'),
+                ).values('n')
+            ),
+            0,
+        )
+        stale = self.alias(actual=actual).exclude(
+            recipe_count=models.F('actual'),
+        )
+        user_ids = set(stale.values_list('user_id', flat=True))
+        if not user_ids:
+            return 0, user_ids
+
+        return stale.update(recipe_count=actual), user_ids
+
+
+class RecipeAttrMixin:
+    """Deletion shared by tags and ingredients."""
+
+    def delete(self, *args, **kwargs):
+        """Delete the row, then refresh the search vectors of its recipes."""
+        db = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self,
+        )
+        with transaction.atomic(using=db, savepoint=False):
+            recipes = type(self).objects.using(db).filter(
+                pk=self.pk,
+            ).linked_recipes()
+            deleted = super().delete(*args, **kwargs)
+            recipes.update_search_vector()
+            return deleted
+
+
+class Tag(RecipeAttrMixin, models.Model):
     """Tag for filtering recipes."""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Recipes linking this row, kept up to date by the recipe app.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_tag_user_name',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                models.F('user'),
+                _name_key(),
+                name='tag_name_prefix_idx',
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', 'name'],
+                name='tag_usage_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
+class Ingredient(RecipeAttrMixin, models.Model):
     """Ingredient for recipe."""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Recipes linking this row, kept up to date by the recipe app.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_user_name',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                models.F('user'),
+                _name_key(),
+                name='ingredient_name_prefix_idx',
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', 'name'],
+                name='ingredient_usage_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,43 @@
+"""
+JSON parser using orjson when it is installed.
+"""
+import re
+from io import BytesIO
+
+from rest_framework import parsers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Any run of 20 digits, which may not fit in 64 bits.
+_LONG_NUMBER = re.compile(rb'\d{20}')
+
+
+class FastJSONParser(parsers.JSONParser):
+    """Parse JSON with orjson, falling back to DRF's stdlib parser.
+
+    orjson only reads UTF-8 and always rejects NaN and Infinity, so
+    other charsets and non strict parsing use the stdlib parser. So do
+    bodies orjson rejects, and bodies with a number too long for it to
+    read exactly: integers wider than 64 bits are an error or a lossy
+    float depending on the orjson version, where the stdlib keeps them.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parsers.get_encoding(parser_context)
+        if (orjson is None or not self.strict or
+                encoding.lower().replace('-', '') != 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if not _LONG_NUMBER.search(body):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+
+        return super().parse(BytesIO(body), media_type, parser_context)
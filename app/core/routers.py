@@ -0,0 +1,173 @@
+"""
+Database routing for read replicas.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def _recent_write_key(user_id):
+    return f'db:recent-write:{user_id}'
+
+
+def mark_recent_write(user_id):
+    """Keep a user's reads on the primary while replicas catch up."""
+    cache.set(
+        _recent_write_key(user_id),
+        True,
+        timeout=settings.READ_YOUR_WRITES_SECONDS,
+    )
+
+
+def choose_replica(user):
+    """Return a replica alias to read from for a user, or None."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    if user.is_authenticated and cache.get(_recent_write_key(user.id)):
+        return None
+
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+async def achoose_replica(user):
+    """Async version of choose_replica()."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    if user.is_authenticated and await cache.aget(_recent_write_key(user.id)):
+        return None
+
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def replica_may_lag(user):
+    """Return whether this request reads a replica that may lack writes.
+
+    That is when a replica was chosen for the request and the user has
+    written since, or was about to: the replica may not have caught up.
+    """
+    return (
+        _read_alias.get() is not None and
+        user.is_authenticated and
+        bool(cache.get(_recent_write_key(user.id)))
+    )
+
+
+async def areplica_may_lag(user):
+    """Async version of replica_may_lag()."""
+    return (
+        _read_alias.get() is not None and
+        user.is_authenticated and
+        bool(await cache.aget(_recent_write_key(user.id)))
+    )
+
+
+def _read_from(alias, items):
+    """Iterate items with reads routed to alias.
+
+    The alias is set around each step only, as a streamed response may
+    be consumed after the request and from another context.
+    """
+    items = iter(items)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            item = next(items)
+        except StopIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield item
+
+
+async def _aread_from(alias, items):
+    """Async version of _read_from(), for async streamed responses."""
+    items = aiter(items)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            item = await anext(items)
+        except StopAsyncIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield item
+
+
+class ReplicaRouter:
+    """Send reads to the replica chosen for the current request.
+
+    Reads go to the primary unless ReplicaReadMixin picked a replica
+    for the request being served. Writes always go to the primary, even
+    for objects that were loaded from a replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaReadMixin:
+    """Serve safe requests of a viewset from a replica.
+
+    After a successful write the user's reads stay on the primary for
+    READ_YOUR_WRITES_SECONDS, so they always see their own changes.
+    Streamed responses keep reading from the replica while they are
+    consumed.
+    """
+
+    def _set_read_alias(self, alias):
+        if alias is not None:
+            self._read_alias_token = _read_alias.set(alias)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self._set_read_alias(choose_replica(request.user))
+
+    async def ainitial(self, request, *args, **kwargs):
+        """Async version of initial(), for AsyncReadView."""
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self._set_read_alias(await achoose_replica(request.user))
+
+    def _reset_read_alias(self):
+        token = self.__dict__.pop('_read_alias_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # Uncaught errors skip finalize_response().
+            self._reset_read_alias()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        alias = _read_alias.get()
+        self._reset_read_alias()
+        if (request.method not in SAFE_METHODS and
+                response.status_code < 400 and
+                request.user.is_authenticated):
+            mark_recent_write(request.user.id)
+        if alias is not None and getattr(response, 'streaming', False):
+            read_from = _aread_from if response.is_async else _read_from
+            response.streaming_content = read_from(
+                alias, response.streaming_content,
+            )
+
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,53 @@
+"""
+File storage for uploaded media.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(content):
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+
+    sha256 = hashlib.sha256()
+    for chunk in content.chunks():
+        sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming each file after a hash of its content.
+
+    The directory and extension of the requested name are kept. Saving
+    bytes that are already stored returns the existing name without
+    writing anything, so identical uploads share one file. Its modified
+    time is refreshed instead, so gc_recipe_images, which only deletes
+    files older than --min-age, keeps it while the upload commits.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        ext = os.path.splitext(name)[1].lower()
+        name = os.path.join(
+            os.path.dirname(name), f'{content_hash(content)}{ext}'
+        )
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+
+        return super().save(name, content, max_length=max_length)
@@ -1,8 +1,26 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
-from psycopg2 import OperationalError as psycipg2OpError
+from psycopg import OperationalError as PsycopgOpError
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from rest_framework.mixins import ListModelMixin
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.async_views import AsyncListModelMixin
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -20,10 +38,469 @@ class CommandTest(SimpleTestCase):
     @patch('time.sleep')
     def test_wait_for_db_delay(self, patched_sleep, patched_check):
         """Test Waiting for db when getting OperationalError."""
-        patched_check.side_effect = [psycipg2OpError] * 2 + \
+        patched_check.side_effect = [PsycopgOpError] * 2 + \
             [OperationalError] * 3 + [True]
 
         call_command('wait_for_db')
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test benchmark commands."""
+
+    def test_benchmark_recipe_filters(self):
+        """Test filter benchmark reports each plan and cleans up."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_recipe_filters',
+            recipes=20,
+            tags=5,
+            tags_per_recipe=2,
+            filter_tags=2,
+            repeat=1,
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('join + distinct (legacy)', output)
+        self.assertIn('exists (match=any)', output)
+        self.assertIn('group by (match=all)', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_recipe_filters_no_plans(self):
+        """Test --no-plans prints one timing line per plan only."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_recipe_filters',
+            recipes=20,
+            tags=5,
+            filter_tags=2,
+            repeat=1,
+            no_plans=True,
+            stdout=out,
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all('rows, median' in line for line in lines))
+
+    def test_benchmark_assigned_only(self):
+        """Test assigned_only benchmark reports each size and cleans up."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_assigned_only',
+            recipes=[5, 20],
+            tags=5,
+            tags_per_recipe=2,
+            repeat=1,
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('20 recipes, join + distinct (legacy)', output)
+        self.assertIn('20 recipes, exists', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_api(self):
+        """Test API benchmark writes comparable results and cleans up."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'results.json')
+
+            call_command(
+                'benchmark_api',
+                users=1,
+                recipes=10,
+                tags=5,
+                ingredients=5,
+                iterations=2,
+                output=output,
+                stdout=StringIO(),
+            )
+            with open(output) as f:
+                results = json.load(f)
+            out = StringIO()
+            call_command(
+                'benchmark_api',
+                users=1,
+                recipes=10,
+                tags=5,
+                ingredients=5,
+                iterations=2,
+                only=['recipe_list', 'user_me'],
+                compare=output,
+                stdout=out,
+            )
+
+        self.assertEqual(results['meta']['dataset']['recipes'], 10)
+        recipe_list = results['results']['recipe_list']
+        self.assertEqual(recipe_list['status'], 200)
+        self.assertEqual(recipe_list['iterations'], 2)
+        self.assertGreater(recipe_list['queries'], 0)
+        self.assertIn('p99_ms', results['results']['recipe_upload_image'])
+        self.assertIn('recipe_list: p50', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_benchmark_api_leaves_cache_alone(self):
+        """Test the API benchmark never clears the configured cache."""
+        cache.set('unrelated', 'kept')
+        self.addCleanup(cache.delete, 'unrelated')
+
+        call_command(
+            'benchmark_api',
+            users=1,
+            recipes=5,
+            tags=2,
+            ingredients=2,
+            iterations=1,
+            only=['recipe_list'],
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(cache.get('unrelated'), 'kept')
+
+    def test_benchmark_recipe_serializers(self):
+        """Test serializer benchmark reports both paths and cleans up."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_recipe_serializers',
+            rows=[5, 10],
+            tags=4,
+            attrs_per_recipe=2,
+            repeat=1,
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('10 rows, RecipeSerializer', output)
+        self.assertIn('10 rows, RecipeValuesSerializer', output)
+        self.assertIn('10 rows, speedup', output)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class GcRecipeImagesCommandTests(TestCase):
+    """Test the gc_recipe_images command."""
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name,
+        )
+        self.settings_override.enable()
+        self.storage = Recipe._meta.get_field('image').storage
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+        )
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title='sample recipe',
+            time_minutes=5,
+            price=Decimal('5.50'),
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def test_gc_removes_orphaned_images(self):
+        """Test unreferenced files are deleted and used ones kept."""
+        used = self.storage.save(
+            'uploads/recipe/a.jpg', ContentFile(b'used'),
+        )
+        orphan = self.storage.save(
+            'uploads/recipe/b.jpg', ContentFile(b'orphan'),
+        )
+        self.recipe.image = used
+        self.recipe.save()
+
+        call_command('gc_recipe_images', min_age=0, stdout=StringIO())
+
+        self.assertTrue(self.storage.exists(used))
+        self.assertFalse(self.storage.exists(orphan))
+
+    def test_gc_keeps_recent_files(self):
+        """Test files younger than min age are kept."""
+        orphan = self.storage.save(
+            'uploads/recipe/b.jpg', ContentFile(b'orphan'),
+        )
+
+        call_command('gc_recipe_images', stdout=StringIO())
+
+        self.assertTrue(self.storage.exists(orphan))
+
+    def test_gc_keeps_reused_file(self):
+        """Test an old orphan reused by a new upload is kept."""
+        orphan = self.storage.save(
+            'uploads/recipe/b.jpg', ContentFile(b'orphan'),
+        )
+        os.utime(self.storage.path(orphan), (0, 0))
+
+        # An upload of the same bytes, not committed yet.
+        self.storage.save('uploads/recipe/c.jpg', ContentFile(b'orphan'))
+        call_command('gc_recipe_images', stdout=StringIO())
+
+        self.assertTrue(self.storage.exists(orphan))
+
+    def test_gc_dry_run(self):
+        """Test a dry run lists files without deleting them."""
+        orphan = self.storage.save(
+            'uploads/recipe/b.jpg', ContentFile(b'orphan'),
+        )
+        out = StringIO()
+
+        call_command('gc_recipe_images', min_age=0, dry_run=True, stdout=out)
+
+        self.assertIn(orphan, out.getvalue())
+        self.assertTrue(self.storage.exists(orphan))
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def _write(self, file_name, content):
+        path = os.path.join(self.tmp_dir.name, file_name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_import_ndjson(self):
+        """Test importing NDJSON in batches links tags and ingredients."""
+        lines = [
+            json.dumps({
+                'title': f'Soup {i}',
+                'time_minutes': 10,
+                'price': '4.50',
+                'tags': [{'name': 'Dinner'}, {'name': 'Vegan'}],
+                'ingredients': [{'name': 'Kale'}],
+            })
+            for i in range(5)
+        ]
+        path = self._write('recipes.ndjson', '\n'.join(lines))
+        out = StringIO()
+
+        call_command(
+            'import_recipes', path, user=self.user.email, batch_size=2,
+            stdout=out,
+        )
+
+        self.assertIn('Imported 5 recipes', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.tag.recipe_set.count(), 5)
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 5)
+        recipe = recipes.get(title='Soup 3')
+        self.assertEqual(recipe.price, Decimal('4.50'))
+        self.assertEqual(
+            list(recipe.ingredients.values_list('name', flat=True)),
+            ['Kale'],
+        )
+        self.assertEqual(recipes.search('kale').count(), 5)
+
+    def test_import_csv_from_stdin(self):
+        """Test importing CSV read from stdin."""
+        content = (
+            'id,title,time_minutes,price,link,tags,ingredients,description\n'
+            '7,Salad,5,3.25,,Dinner|Lunch,Kale|Salt,"Fresh, green"\n'
+        )
+
+        with patch('sys.stdin', StringIO(content)):
+            call_command(
+                'import_recipes', '-', user=self.user.email, format='csv',
+                stdout=StringIO(),
+            )
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Salad')
+        self.assertEqual(recipe.description, 'Fresh, green')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Dinner', 'Lunch'],
+        )
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_import_invalid_record_error(self):
+        """Test an invalid record stops the import at its line."""
+        path = self._write('recipes.ndjson', '\n'.join([
+            json.dumps({'title': 'Ok', 'time_minutes': 5, 'price': '1'}),
+            json.dumps({'title': 'Bad', 'time_minutes': 5, 'price': '1000'}),
+        ]))
+
+        with self.assertRaisesMessage(CommandError, 'line 2: price'):
+            call_command(
+                'import_recipes', path, user=self.user.email,
+                stdout=StringIO(),
+            )
+
+        self.assertFalse(Recipe.objects.exists())
+
+
+class RebuildRecipeCountsCommandTests(TestCase):
+    """Test the rebuild_recipe_counts command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+        )
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('2.00'),
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Kale',
+        )
+        recipe.tags.add(self.tag)
+        recipe.ingredients.add(self.ingredient)
+
+    def test_rebuild_fixes_drifted_counts(self):
+        """Test counts that are off are recounted from the links."""
+        Tag.objects.update(recipe_count=7)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+        )
+        other_tag = Tag.objects.create(user=other, name='Lunch',
+                                       recipe_count=3)
+        out = StringIO()
+
+        call_command('rebuild_recipe_counts', stdout=out)
+
+        self.assertIn('tags: 2 fixed', out.getvalue())
+        self.assertIn('ingredients: 0 fixed', out.getvalue())
+        self.tag.refresh_from_db()
+        other_tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 1)
+        self.assertEqual(other_tag.recipe_count, 0)
+
+    def test_rebuild_for_user(self):
+        """Test --user leaves other users' counts alone."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+        )
+        other_tag = Tag.objects.create(user=other, name='Lunch',
+                                       recipe_count=3)
+        Ingredient.objects.update(recipe_count=0)
+
+        call_command(
+            'rebuild_recipe_counts', user=self.user.email, stdout=StringIO(),
+        )
+
+        self.ingredient.refresh_from_db()
+        other_tag.refresh_from_db()
+        self.assertEqual(self.ingredient.recipe_count, 1)
+        self.assertEqual(other_tag.recipe_count, 3)
+
+
+class BenchmarkConnectionsCommandTests(TransactionTestCase):
+    """Test the connection load test, which commits its data."""
+
+    def test_benchmark_connections(self):
+        """Test connections are only reused in the configured mode."""
+        out = StringIO()
+
+        with override_settings(RECIPE_IMAGE_WORKERS=0):
+            call_command(
+                'benchmark_connections',
+                recipes=5,
+                requests=6,
+                concurrency=2,
+                stdout=out,
+            )
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith(
+            'per-request: 6 requests, 6 connections opened'
+        ))
+        self.assertTrue(lines[1].startswith(
+            'persistent: 6 requests, 2 connections opened'
+        ))
+        self.assertRegex(lines[2], r'^pooled: 6 requests, [12] connections')
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_benchmark_connections_leaves_cache_alone(self):
+        """Test the connection benchmark never clears the configured cache."""
+        cache.set('unrelated', 'kept')
+        self.addCleanup(cache.delete, 'unrelated')
+
+        with override_settings(RECIPE_IMAGE_WORKERS=0):
+            call_command(
+                'benchmark_connections',
+                recipes=5,
+                requests=2,
+                concurrency=1,
+                modes=['persistent'],
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(cache.get('unrelated'), 'kept')
+
+
+class BenchmarkConcurrencyCommandTests(TransactionTestCase):
+    """Test the WSGI and ASGI throughput comparison."""
+
+    def test_benchmark_concurrency(self):
+        """Test every mode serves all requests and the data is removed."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_concurrency',
+            recipes=5,
+            requests=6,
+            concurrency=3,
+            threads=2,
+            client_delay=0,
+            stdout=out,
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            [line.split(':')[0] for line in lines],
+            ['wsgi', 'asgi-sync', 'asgi-async'],
+        )
+        for line in lines:
+            self.assertIn(': 6 requests', line)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_benchmark_concurrency_lists_uncached(self):
+        """Test every list request reaches the view, on a private cache."""
+        cache.set('unrelated', 'kept')
+        self.addCleanup(cache.delete, 'unrelated')
+
+        with patch.object(ListModelMixin, 'list', autospec=True,
+                          side_effect=ListModelMixin.list) as mock_list, \
+                patch.object(AsyncListModelMixin, 'alist', autospec=True,
+                             side_effect=AsyncListModelMixin.alist) as \
+                mock_alist:
+            call_command(
+                'benchmark_concurrency',
+                recipes=5,
+                requests=8,
+                concurrency=2,
+                threads=2,
+                client_delay=0,
+                modes=['wsgi', 'asgi-async'],
+                stdout=StringIO(),
+            )
+
+        # Half the requests are lists, in each mode.
+        self.assertEqual(mock_list.call_count, 4)
+        self.assertEqual(mock_alist.call_count, 4)
+        self.assertEqual(cache.get('unrelated'), 'kept')
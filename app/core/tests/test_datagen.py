@@ -0,0 +1,66 @@
+"""
+Tests for the synthetic dataset generator.
+"""
+from django.test import TestCase
+
+from core.datagen import DatasetGenerator
+from core.models import Recipe, Tag
+
+
+class DatasetGeneratorTests(TestCase):
+    """Test generating benchmark data."""
+
+    def _snapshot(self, **kwargs):
+        """Generate a dataset and return its content without ids."""
+        generator = DatasetGenerator(**kwargs)
+        user = generator.generate()[0]
+        recipes = Recipe.objects.filter(user=user).order_by('id')
+        snapshot = [
+            (
+                recipe.title,
+                recipe.price,
+                sorted(tag.name for tag in recipe.tags.all()),
+                sorted(ing.name for ing in recipe.ingredients.all()),
+            )
+            for recipe in recipes.prefetch_related('tags', 'ingredients')
+        ]
+        user.delete()
+
+        return snapshot
+
+    def test_generate_counts(self):
+        """Test the generator creates the requested rows."""
+        generator = DatasetGenerator(
+            users=2, recipes=30, tags=25, ingredients=10,
+        )
+
+        users = generator.generate()
+
+        self.assertEqual(len(users), 2)
+        for user in users:
+            self.assertEqual(Recipe.objects.filter(user=user).count(), 30)
+            self.assertEqual(Tag.objects.filter(user=user).count(), 25)
+            self.assertEqual(len(generator.recipe_ids[user.id]), 30)
+        self.assertFalse(
+            Recipe.objects.filter(search_vector__isnull=True).exists()
+        )
+
+    def test_generate_deterministic(self):
+        """Test the same seed gives the same data and another does not."""
+        first = self._snapshot(seed=1, recipes=20)
+        second = self._snapshot(seed=1, recipes=20)
+        other = self._snapshot(seed=2, recipes=20)
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_popular_tags_used_most(self):
+        """Test tag usage is skewed towards the first tags."""
+        generator = DatasetGenerator(recipes=300, tags=20)
+        user = generator.generate()[0]
+        tags = generator.tags[user.id]
+
+        first = tags[0].recipe_set.count()
+        last = tags[-1].recipe_set.count()
+
+        self.assertGreater(first, last * 3)
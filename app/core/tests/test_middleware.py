@@ -0,0 +1,94 @@
+"""
+Tests for the request metrics middleware.
+"""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import Histogram, registry
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('api-metrics')
+
+
+class HistogramTests(SimpleTestCase):
+    """Test the histogram used for the metrics."""
+
+    def test_buckets_cumulative(self):
+        """Test buckets count every observation at or below them."""
+        histogram = Histogram((1, 10))
+        for value in (0.5, 1, 5, 50):
+            histogram.observe(value)
+
+        data = histogram.as_dict()
+
+        self.assertEqual(data['buckets'], {'1': 2, '10': 3, '+Inf': 4})
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['sum'], 56.5)
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    """Test sampled requests are timed and aggregated."""
+
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price='2.00',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        """Test requests are left alone when sampling is off."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', res)
+        self.assertEqual(registry.snapshot(), {})
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_sampled(self):
+        """Test sampled requests get Server-Timing and are aggregated."""
+        res = self.client.get(RECIPES_URL)
+
+        timing = res['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('total;dur=', timing)
+        view = registry.snapshot()['GET recipe:recipe-list']
+        self.assertEqual(view['total_ms']['count'], 1)
+        self.assertGreater(view['queries']['sum'], 0)
+        self.assertIn(f'"{view["queries"]["sum"]} queries"', timing)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_metrics_admin_only(self):
+        """Test the metrics endpoint is only served to admins."""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_metrics(self):
+        """Test admins get the histograms of every view."""
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.get(RECIPES_URL)
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['sample_rate'], 1)
+        self.assertIn('GET recipe:recipe-list', res.data['views'])
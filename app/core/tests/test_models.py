@@ -1,11 +1,15 @@
 """
 Test for models
 """
-from unittest.mock import patch
+import hashlib
+import tempfile
 from django.test import TestCase
+from django.db import IntegrityError
 from django.contrib.auth import get_user_model
 from decimal import Decimal
+from django.core.files.base import ContentFile
 from core import models
+from core.storage import ContentAddressedStorage
 
 
 def create_user(email='user@example.com', password='testpass123'):
@@ -85,6 +89,16 @@ class ModelTest(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        other_user = create_user(email='other@example.com')
+        models.Tag.objects.create(user=user, name='Tag1')
+        models.Tag.objects.create(user=other_user, name='Tag1')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Tag1')
+
     def test_create_ingredient(self):
         """test creating a ingredient successful."""
         user = create_user()
@@ -95,11 +109,24 @@ class ModelTest(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
-    @patch('core.models.uuid.uuid4')
-    def test_recipe_file_name_uuif(self, mock_uuid):
+    def test_recipe_file_name_keeps_extension(self):
         """Test generating image path."""
-        uuid = 'test-uuid'
-        mock_uuid.return_value = uuid
-        file_path = models.recipe_image_file_path(None, 'example.jpg')
+        file_path = models.recipe_image_file_path(None, 'example.JPG')
+
+        self.assertEqual(file_path, 'uploads/recipe/image.jpg')
+
+    def test_recipe_image_named_by_content(self):
+        """Test identical images are stored once under their hash."""
+        content = b'same image bytes'
+        digest = hashlib.sha256(content).hexdigest()
+        with tempfile.TemporaryDirectory() as media_root:
+            storage = ContentAddressedStorage(location=media_root)
+
+            name1 = storage.save('uploads/recipe/a.jpg', ContentFile(content))
+            name2 = storage.save('uploads/recipe/b.jpg', ContentFile(content))
 
-        self.assertEqual(file_path, f"uploads/recipe/{uuid}.jpg")
+            self.assertEqual(name1, f'uploads/recipe/{digest}.jpg')
+            self.assertEqual(name1, name2)
+            self.assertEqual(storage.listdir('uploads/recipe')[1], [
+                f'{digest}.jpg',
+            ])
@@ -0,0 +1,58 @@
+"""
+Tests for the JSON parser.
+"""
+from io import BytesIO
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from core import parsers
+from core.parsers import FastJSONParser
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the parser matches DRF's JSONParser."""
+
+    body = (
+        '{"title": "Crème brûlée", "price": 5.10, "time_minutes": 30, '
+        '"tags": [{"name": "Dessert"}], "link": null}'
+    ).encode()
+
+    def test_parse_matches_json_parser(self):
+        """Test parsing gives the same data as JSONParser."""
+        expected = JSONParser().parse(BytesIO(self.body))
+
+        res = FastJSONParser().parse(BytesIO(self.body))
+
+        self.assertEqual(res, expected)
+
+    def test_parse_invalid_json_error(self):
+        """Test invalid JSON and NaN raise a parse error."""
+        for body in [b'{"title": ', b'{"price": NaN}']:
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    FastJSONParser().parse(BytesIO(body))
+
+    def test_parse_big_int(self):
+        """Test integers wider than 64 bits are read exactly."""
+        for body in [b'{"n": 123456789012345678901234567890}',
+                     b'{"n": -123456789012345678901}']:
+            with self.subTest(body=body):
+                expected = JSONParser().parse(BytesIO(body))
+
+                res = FastJSONParser().parse(BytesIO(body))
+
+                self.assertEqual(res, expected)
+                self.assertIsInstance(res['n'], int)
+
+    def test_fallback_without_orjson(self):
+        """Test the stdlib parser is used when orjson is missing."""
+        expected = JSONParser().parse(BytesIO(self.body))
+
+        with patch.object(parsers, 'orjson', None):
+            res = FastJSONParser().parse(BytesIO(self.body))
+
+        self.assertEqual(res, expected)
@@ -0,0 +1,120 @@
+"""
+Tests for the JSON renderer.
+"""
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import renderers
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the renderer matches DRF's JSONRenderer."""
+
+    data = {
+        'price': Decimal('5.10'),
+        'created': datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        'title': 'Crème brûlée\u2028\u2029',
+        'lazy': gettext_lazy('Recipe not found.'),
+        0: {'id': ['Recipe listed more than once.']},
+        'nested': [1, 2.5, None, True],
+    }
+
+    def test_output_matches_json_renderer(self):
+        """Test rendering gives the same bytes as JSONRenderer."""
+        expected = JSONRenderer().render(self.data)
+
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+
+    def test_indent_matches_json_renderer(self):
+        """Test indented output is left to JSONRenderer."""
+        media_type = 'application/json; indent=4'
+        expected = JSONRenderer().render(self.data, media_type)
+
+        res = FastJSONRenderer().render(self.data, media_type)
+
+        self.assertEqual(res, expected)
+
+    def test_big_int_falls_back(self):
+        """Test integers wider than 64 bits render like JSONRenderer."""
+        data = {'n': 2 ** 70, 'items': [-(2 ** 64)]}
+        expected = JSONRenderer().render(data)
+
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+
+    def test_float_exponent_spelling(self):
+        """Test large floats decode the same but skip the exponent sign."""
+        data = {'n': 1e16, 'm': 1.5e-7}
+
+        res = FastJSONRenderer().render(data)
+
+        self.assertEqual(res, b'{"n":1e16,"m":1.5e-7}')
+        self.assertEqual(json.loads(res), json.loads(
+            JSONRenderer().render(data),
+        ))
+
+    def test_fallback_without_orjson(self):
+        """Test the stdlib renderer is used when orjson is missing."""
+        expected = JSONRenderer().render(self.data)
+
+        with patch.object(renderers, 'orjson', None):
+            res = FastJSONRenderer().render(self.data)
+
+        self.assertEqual(res, expected)
+
+
+class RenderedEndpointsTests(TestCase):
+    """Test API responses render as they did with JSONRenderer."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Zoë',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Crème brûlée',
+            time_minutes=30,
+            price=Decimal('5.00'),
+            description='Caramelised\u2028sugar',
+        )
+        self.recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Dessert'),
+        )
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Crème'),
+        )
+
+    def test_endpoints_render_like_json_renderer(self):
+        """Test each endpoint renders the same bytes as JSONRenderer."""
+        urls = [
+            reverse('recipe:recipe-list'),
+            reverse('recipe:recipe-detail', args=[self.recipe.id]),
+            reverse('recipe:tag-list'),
+            reverse('recipe:ingredient-list'),
+            reverse('user:me'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                res = self.client.get(url)
+
+                self.assertIsInstance(
+                    res.accepted_renderer, FastJSONRenderer,
+                )
+                self.assertEqual(
+                    res.content, JSONRenderer().render(res.data),
+                )
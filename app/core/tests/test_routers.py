@@ -0,0 +1,209 @@
+"""
+Tests for read replica routing.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.routers import ReplicaRouter, achoose_replica, mark_recent_write
+from recipe.cache import bump_cache_version
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+TAGS_URL = reverse('recipe:tag-list')
+ME_URL = reverse('user:me')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test safe requests read from a second alias of the test database.
+
+    The alias is added once the test runner has set up the databases,
+    as a mirror of the test database. Data is committed, so both
+    connections see it.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings['replica'] = {
+            **connections.settings['default'],
+            'TEST': {**connections.settings['default']['TEST'],
+                     'MIRROR': 'default'},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def _queries(self, method, url, data=None):
+        """Return the response and the number of queries per alias."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            res = getattr(self.client, method)(url, data, format='json')
+
+        return res, len(primary), len(replica)
+
+    def test_reads_go_to_replica(self):
+        """Test listing recipes and tags reads from the replica."""
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('2.00'),
+        )
+
+        res, _primary, replica = self._queries('get', RECIPES_URL)
+        self.assertEqual(len(res.data), 1)
+        self.assertGreater(replica, 0)
+
+        res, _primary, replica = self._queries('get', TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreater(replica, 0)
+
+    def test_streamed_export_reads_from_replica(self):
+        """Test an export keeps reading the replica while it streams."""
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('2.00'),
+        )
+        res = self.client.get(EXPORT_URL)
+
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            body = b''.join(res.streaming_content)
+
+        self.assertIn(b'Soup', body)
+        self.assertGreater(len(replica), 0)
+        self.assertEqual(len(primary), 0)
+
+    def test_async_streamed_export_reads_from_replica(self):
+        """Test an export streamed under ASGI keeps reading the replica."""
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('2.00'),
+        )
+        token = Token.objects.get(user=self.user)
+        headers = {'authorization': f'Token {token.key}'}
+
+        async def export():
+            res = await AsyncClient().get(EXPORT_URL, headers=headers)
+            return res, b''.join([
+                chunk async for chunk in res.streaming_content
+            ])
+
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            res, body = async_to_sync(export)()
+
+        self.assertTrue(res.is_async)
+        self.assertIn(b'Soup', body)
+        self.assertGreater(len(replica), 0)
+        self.assertFalse(any(
+            'core_recipe' in query['sql'] for query in primary
+        ))
+
+    def test_async_choice_uses_async_cache(self):
+        """Test the async replica choice awaits the cache."""
+        with patch('core.routers.cache.aget', wraps=cache.aget) as aget:
+            self.assertEqual(async_to_sync(achoose_replica)(self.user),
+                             'replica')
+            mark_recent_write(self.user.id)
+            self.assertIsNone(async_to_sync(achoose_replica)(self.user))
+
+        self.assertEqual(aget.await_count, 2)
+
+    def test_reads_after_write_go_to_primary(self):
+        """Test a user reads their own writes from the primary."""
+        res, _primary, _replica = self._queries('post', RECIPES_URL, {
+            'title': 'Soup', 'time_minutes': 5, 'price': '2.00',
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res, primary, replica = self._queries('get', RECIPES_URL)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_window_expires(self):
+        """Test reads go back to the replica after the window."""
+        self._queries('post', RECIPES_URL, {
+            'title': 'Soup', 'time_minutes': 5, 'price': '2.00',
+        })
+        # As if READ_YOUR_WRITES_SECONDS had passed.
+        cache.delete(f'db:recent-write:{self.user.id}')
+
+        res, _primary, replica = self._queries('get', RECIPES_URL)
+
+        self.assertGreater(replica, 0)
+
+    def test_lagging_replica_list_not_cached(self):
+        """Test lists from a replica behind the user's writes are not kept."""
+        mark_recent_write(self.user.id)
+
+        # A replica chosen just before the write was marked.
+        with patch('core.routers.choose_replica', return_value='replica'):
+            for _ in range(2):
+                res, _primary, replica = self._queries('get', RECIPES_URL)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertNotIn('ETag', res)
+                self.assertGreater(replica, 0)
+
+        cache.delete(f'db:recent-write:{self.user.id}')
+        res, _primary, replica = self._queries('get', RECIPES_URL)
+        self.assertIn('ETag', res)
+        res, primary, replica = self._queries('get', RECIPES_URL)
+        self.assertEqual(primary + replica, 0)
+
+    def test_cache_bump_keeps_reads_on_primary(self):
+        """Test writes outside the views keep the user on the primary."""
+        bump_cache_version(self.user.id)
+
+        res, primary, replica = self._queries('get', RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_other_views_use_primary(self):
+        """Test views without the mixin are left on the primary."""
+        res, primary, replica = self._queries('get', ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(replica, 0)
+
+    def test_writes_go_to_primary(self):
+        """Test the router never writes to a replica."""
+        router = ReplicaRouter()
+
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'core'))
+        self.assertTrue(router.allow_migrate('default', 'core'))
@@ -0,0 +1,38 @@
+"""
+Tests for serving media.
+"""
+import tempfile
+import os
+
+from django.test import RequestFactory, SimpleTestCase
+
+from core.views import serve_media
+
+
+class ServeMediaTests(SimpleTestCase):
+    """Test the media serving view."""
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        self.factory = RequestFactory()
+
+    def _serve(self, file_name):
+        with open(os.path.join(self.media_root.name, file_name), 'wb') as f:
+            f.write(b'image')
+        request = self.factory.get(f'/static/media/{file_name}')
+        return serve_media(
+            request, file_name, document_root=self.media_root.name,
+        )
+
+    def test_hashed_names_immutable(self):
+        """Test content hashed files are cached for good."""
+        res = self._serve(f'{"a" * 64}_small_320.webp')
+
+        self.assertIn('immutable', res['Cache-Control'])
+
+    def test_other_names_not_immutable(self):
+        """Test other files are served without the immutable header."""
+        res = self._serve('photo.jpg')
+
+        self.assertNotIn('Cache-Control', res)
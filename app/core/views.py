@@ -0,0 +1,49 @@
+"""
+Views for serving media during development and request metrics.
+"""
+import os
+import re
+
+from django.conf import settings
+from django.views.static import serve
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.metrics import registry
+from user.authentication import CachedTokenAuthentication
+
+
+HASHED_NAME_RE = re.compile(r'^[0-9a-f]{64}(_\w+)?\.\w+$')
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """Serve a media file, marking content hashed names immutable.
+
+    Files named after the hash of their content never change, so
+    clients and proxies may cache them for good. A production web
+    server in front of MEDIA_ROOT should send the same header.
+    """
+    response = serve(request, path, document_root, show_indexes)
+    if HASHED_NAME_RE.match(os.path.basename(path)):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+
+    return response
+
+
+class MetricsView(APIView):
+    """Per view histograms of sampled request timings and query counts."""
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SessionAuthentication,
+    ]
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        return Response({
+            'sample_rate': settings.REQUEST_METRICS_SAMPLE_RATE,
+            'views': registry.snapshot(),
+        })
@@ -0,0 +1,151 @@
+"""
+Async read paths for the recipe APIs, for ASGI deployments.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
+from django.db.models import QuerySet
+from django.http import Http404, HttpResponse
+from django.urls import re_path
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+
+class AsyncListModelMixin:
+    """Async version of ListModelMixin.list()."""
+
+    async def _aserialize_many(self, items):
+        serializer = self.get_serializer(items, many=True)
+        if hasattr(serializer, 'adata'):
+            return await serializer.adata()
+        if isinstance(items, QuerySet):
+            # Fetch the rows here, not in the sync .data on the loop.
+            serializer.instance = [obj async for obj in items]
+
+        return serializer.data
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Cursor pages are fetched with a few queries in one thread.
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                await self._aserialize_many(page),
+            )
+
+        return Response(await self._aserialize_many(queryset))
+
+
+class AsyncRetrieveModelMixin:
+    """Async version of RetrieveModelMixin.retrieve()."""
+
+    async def aget_object(self):
+        """Async version of get_object()."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (queryset.model.DoesNotExist, TypeError, ValueError,
+                ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+
+        return obj
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
+
+
+class AsyncReadView(View):
+    """Serve a viewset route, reading on the event loop.
+
+    GET runs the viewset's async action (`alist`, `aretrieve`) after
+    authenticating with the async authenticators, so a slow database
+    or client does not hold a worker thread. Every other method is
+    handed to the usual sync viewset view.
+    """
+    viewset = None
+    actions = None
+    basename = None
+    detail = False
+    sync_view = None
+
+    def _viewset(self, request, *args, **kwargs):
+        """Set up the viewset as its own view function would."""
+        viewset = self.viewset(
+            basename=self.basename,
+            detail=self.detail,
+            action_map=self.actions,
+        )
+        viewset.args, viewset.kwargs = args, kwargs
+        viewset.headers = viewset.default_response_headers
+        viewset.request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.format_kwarg = None
+
+        return viewset
+
+    async def _authenticate(self, request):
+        request.user, request.auth = AnonymousUser(), None
+        for authenticator in request.authenticators:
+            user_auth = await authenticator.aauthenticate(request)
+            if user_auth is not None:
+                request.user, request.auth = user_auth
+                return
+
+    async def get(self, request, *args, **kwargs):
+        viewset = self._viewset(request, *args, **kwargs)
+        request = viewset.request
+        try:
+            await self._authenticate(request)
+            # Content negotiation and permission checks, no queries.
+            if hasattr(viewset, 'ainitial'):
+                await viewset.ainitial(request, *args, **kwargs)
+            else:
+                viewset.initial(request, *args, **kwargs)
+            handler = getattr(viewset, f'a{viewset.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+
+        response = viewset.finalize_response(
+            request, response, *args, **kwargs
+        )
+        # Render here, or Django would hand rendering to a thread.
+        response.render()
+        return HttpResponse(
+            response.content,
+            status=response.status_code,
+            headers=response.headers,
+        )
+
+    async def _sync(self, request, *args, **kwargs):
+        return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    post = put = patch = delete = options = _sync
+
+
+def async_read_path(route, viewset, basename, actions, detail=False):
+    """Return a URL pattern serving a viewset route with AsyncReadView.
+
+    Only GET is served asynchronously, the viewset needs an async
+    version (`a<action>`) of the action mapped to it.
+    """
+    actions = {
+        method: action for method, action in actions.items()
+        if hasattr(viewset, action)
+    }
+    actions.setdefault('head', actions['get'])
+    view = AsyncReadView.as_view(
+        viewset=viewset,
+        actions=actions,
+        basename=basename,
+        detail=detail,
+        sync_view=viewset.as_view(actions, basename=basename, detail=detail),
+    )
+
+    name = f'{basename}-{"detail" if detail else "list"}'
+    return re_path(route, csrf_exempt(view), name=name)
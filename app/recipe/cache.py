@@ -0,0 +1,146 @@
+"""
+Per-user response caching for the recipe APIs.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from core.routers import areplica_may_lag, mark_recent_write, replica_may_lag
+
+
+def _version_key(user_id):
+    return f'recipe:version:{user_id}'
+
+
+def get_cache_version(user_id):
+    """Return the current cache version for a user's recipe data."""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a version evicted from the cache can
+        # never come back with a value that old entries were built with.
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+
+    return version
+
+
+async def aget_cache_version(user_id):
+    """Async version of get_cache_version()."""
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, version)
+
+    return version
+
+
+def bump_cache_version(user_id):
+    """Invalidate all cached recipe responses of a user.
+
+    The user's reads are kept on the primary first, so no list read
+    from a lagging replica is cached under the new version.
+    """
+    mark_recent_write(user_id)
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+class CachedListMixin:
+    """Cache list responses per user, query string and cache version.
+
+    Successful writes through the view bump the user's version, which
+    orphans every cached list of theirs. Lists are served with an ETag
+    derived from the cache key, so a matching If-None-Match gets a 304
+    without touching the database or the serializers. Lists read from a
+    replica that may not have the user's latest writes are neither
+    cached nor tagged.
+    """
+
+    def _list_cache_key(self, request, version):
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        return (
+            f'recipe:list:{self.basename}:{request.user.id}:'
+            f'{version}:{path}'
+        )
+
+    def _list_etag(self, key):
+        return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+    def _not_modified(self, request, etag):
+        return etag in parse_etags(request.headers.get('If-None-Match', ''))
+
+    def _finish_list(self, response, etag):
+        if etag is not None:
+            response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        key = self._list_cache_key(
+            request, get_cache_version(request.user.id),
+        )
+        etag = self._list_etag(key)
+        if self._not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cache.get(key)
+            if data is None:
+                response = super().list(request, *args, **kwargs)
+                if replica_may_lag(request.user):
+                    etag = None
+                else:
+                    cache.set(
+                        key,
+                        response.data,
+                        timeout=settings.RECIPE_LIST_CACHE_TIMEOUT,
+                    )
+            else:
+                response = Response(data)
+
+        return self._finish_list(response, etag)
+
+    async def alist(self, request, *args, **kwargs):
+        """Async version of list(), sharing its cache entries."""
+        key = self._list_cache_key(
+            request, await aget_cache_version(request.user.id),
+        )
+        etag = self._list_etag(key)
+        if self._not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = await cache.aget(key)
+            if data is None:
+                response = await super().alist(request, *args, **kwargs)
+                if await areplica_may_lag(request.user):
+                    etag = None
+                else:
+                    await cache.aset(
+                        key,
+                        response.data,
+                        timeout=settings.RECIPE_LIST_CACHE_TIMEOUT,
+                    )
+            else:
+                response = Response(data)
+
+        return self._finish_list(response, etag)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (request.method not in SAFE_METHODS and
+                response.status_code < 400 and
+                request.user.is_authenticated):
+            bump_cache_version(request.user.id)
+
+        return super().finalize_response(request, response, *args, **kwargs)
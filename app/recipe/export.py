@@ -0,0 +1,57 @@
+"""
+Streaming export of recipe libraries.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+
+CSV_LIST_SEPARATOR = '|'
+
+
+def iter_chunks(rows, chunk_size):
+    """Yield lists of up to chunk_size rows from an iterator."""
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def iter_recipes(rows, render_chunk, chunk_size=1000):
+    """Yield rendered recipes from a `.values()` queryset.
+
+    Rows are read through a server side cursor and rendered a chunk at
+    a time, so memory use does not grow with the number of recipes and
+    the first recipes go out before the query has finished.
+    """
+    for chunk in iter_chunks(rows.iterator(chunk_size=chunk_size),
+                             chunk_size):
+        yield from render_chunk(chunk)
+
+
+async def aiter_chunks(items, chunk_size):
+    """Yield the bytes of chunk_size items at a time, for ASGI servers.
+
+    Django reads a sync iterator into a list before sending it under
+    ASGI, so each chunk is fetched from items through sync_to_async
+    instead. The per request thread is kept, with the query's cursor.
+    """
+    items = iter(items)
+    next_chunk = sync_to_async(
+        lambda: b''.join(islice(items, chunk_size)),
+    )
+    while chunk := await next_chunk():
+        yield chunk
+
+
+def flatten_for_csv(item):
+    """Join the tags and ingredients of a recipe into single cells."""
+    flat = {}
+    for name, value in item.items():
+        if isinstance(value, list):
+            value = CSV_LIST_SEPARATOR.join(
+                str(attr['name'] if isinstance(attr, dict) else attr)
+                for attr in value
+            )
+        flat[name] = value
+
+    return flat
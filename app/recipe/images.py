@@ -0,0 +1,130 @@
+"""
+Background processing of uploaded recipe images.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from core.models import Recipe
+
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = {
+    'jpeg': ('JPEG', '.jpg'),
+    'webp': ('WEBP', '.webp'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Return the shared worker pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-image',
+            )
+
+    return _executor
+
+
+def _image_storage():
+    return Recipe._meta.get_field('image').storage
+
+
+def variant_name(image_name, variant, fmt):
+    """Return the storage name of a resized variant of an image.
+
+    The name is derived from the (content hashed) image name and the
+    variant size, so identical images share their variants.
+    """
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    size = settings.RECIPE_IMAGE_VARIANTS[variant]
+    ext = VARIANT_FORMATS[fmt][1]
+    return os.path.join(
+        os.path.dirname(image_name), 'variants',
+        f'{stem}_{variant}_{size}{ext}',
+    )
+
+
+def generate_variants(recipe_id, image_name):
+    """Write resized JPEG and WebP copies of a recipe image.
+
+    Copies already on disk are reused, with their modified time
+    refreshed so gc_recipe_images keeps them. The variants are only
+    recorded if the recipe still has the same image, so a replaced image
+    never gets the old image's variants.
+    """
+    variants = {
+        variant: {
+            fmt: variant_name(image_name, variant, fmt)
+            for fmt in VARIANT_FORMATS
+        }
+        for variant in settings.RECIPE_IMAGE_VARIANTS
+    }
+    missing = []
+    for variant, formats in variants.items():
+        for fmt, name in formats.items():
+            if default_storage.exists(name):
+                os.utime(default_storage.path(name))
+            else:
+                missing.append((variant, fmt, name))
+    if missing:
+        with _image_storage().open(image_name) as image_file:
+            with Image.open(image_file) as original:
+                original = original.convert('RGB')
+                resized = {}
+                for variant, fmt, name in missing:
+                    if variant not in resized:
+                        size = settings.RECIPE_IMAGE_VARIANTS[variant]
+                        resized[variant] = original.copy()
+                        resized[variant].thumbnail((size, size))
+                    buffer = BytesIO()
+                    resized[variant].save(
+                        buffer, format=VARIANT_FORMATS[fmt][0], quality=85,
+                    )
+                    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    Recipe.objects.filter(id=recipe_id, image=image_name).update(
+        image_variants=variants,
+    )
+
+    return variants
+
+
+def _run_in_worker(recipe_id, image_name):
+    try:
+        generate_variants(recipe_id, image_name)
+    except Exception:
+        logger.exception('Failed to process image %s', image_name)
+    finally:
+        connection.close()
+
+
+def schedule_variants(recipe):
+    """Queue variant generation for a recipe once the upload commits.
+
+    With RECIPE_IMAGE_WORKERS set to 0 the variants are made inline.
+    """
+    recipe_id, image_name = recipe.id, recipe.image.name
+
+    def submit():
+        if settings.RECIPE_IMAGE_WORKERS:
+            _get_executor().submit(_run_in_worker, recipe_id, image_name)
+        else:
+            generate_variants(recipe_id, image_name)
+
+    transaction.on_commit(submit)
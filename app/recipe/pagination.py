@@ -0,0 +1,55 @@
+"""
+Pagination for the recipe APIs.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    """Cursor pagination used only when the client asks for it.
+
+    Requests without a `cursor` or `page_size` param get the full list
+    back, as before. Pages are addressed by the position of the last
+    row rather than an offset, so every page costs the same.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (self.cursor_query_param not in params and
+                self.page_size_query_param not in params):
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipeCursorPagination(OptInCursorPagination):
+    """Cursor pagination for recipes, newest first."""
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        """Page search results by rank instead of age."""
+        if request.query_params.get('search'):
+            return ('-rank', '-id')
+
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(OptInCursorPagination):
+    """Cursor pagination for tags and ingredients."""
+    ordering = '-name'
+
+    def get_ordering(self, request, queryset, view):
+        """Page by usage when the list is ordered by it."""
+        if request.query_params.get('ordering') == 'usage':
+            return ('-recipe_count', 'name')
+
+        return super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Leave autocomplete results alone, they are capped already."""
+        if request.query_params.get('q'):
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
@@ -1,6 +1,13 @@
 """
 Serializers for Recipe APIs.
 """
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils.translation import gettext as _
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from core.models import (
@@ -8,9 +15,27 @@ from core.models import (
     Tag,
     Ingredient,
 )
+from recipe.cache import bump_cache_version
+
+
+class BaseRecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for recipe attributes."""
 
+    def validate_name(self, value):
+        """Reject renaming onto a name the user already has."""
+        if self.instance is not None:
+            duplicate = type(self.instance).objects.filter(
+                user=self.instance.user,
+                name=value,
+            ).exclude(pk=self.instance.pk).exists()
+            if duplicate:
+                msg = _("You already have one with this name.")
+                raise serializers.ValidationError(msg)
 
-class IngredientSerializer(serializers.ModelSerializer):
+        return value
+
+
+class IngredientSerializer(BaseRecipeAttrSerializer):
     """Serializer for ingredients model."""
 
     class Meta:
@@ -19,7 +44,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(BaseRecipeAttrSerializer):
     """Serializer fo rtags."""
 
     class Meta:
@@ -28,7 +53,139 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class TagUsageSerializer(TagSerializer):
+    """Serializer for tags with the number of recipes using them."""
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+        read_only_fields = ['id', 'recipe_count']
+
+
+class IngredientUsageSerializer(IngredientSerializer):
+    """Serializer for ingredients with the number of recipes using them."""
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+        read_only_fields = ['id', 'recipe_count']
+
+
+class SparseFieldsMixin:
+    """Render only the fields and nested relations a request asks for.
+
+    `fields` limits the fields rendered. Nested relations not named in
+    `expand` are rendered as lists of ids instead of objects.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if expand is not None:
+            for name, field in list(self.fields.items()):
+                if (isinstance(field, serializers.ListSerializer) and
+                        name not in expand):
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(
+                        many=True, read_only=True,
+                    )
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Serializer for writing many recipes with bulk queries."""
+    related_fields = (('tags', Tag), ('ingredients', Ingredient))
+
+    def _pop_related(self, validated_data):
+        """Pop nested tags and ingredients off every item."""
+        return {
+            field: [item.pop(field, None) for item in validated_data]
+            for field, _model in self.related_fields
+        }
+
+    def _set_related(self, recipes, related, replace):
+        """Link recipes to the tags and ingredients named in their items.
+
+        Names are resolved for the whole batch at once and links are
+        written with one bulk insert (and one delete when replacing).
+        Bulk writes send no M2M signals, so recipe counts are adjusted
+        here, in one more query.
+        """
+        for field, model in self.related_fields:
+            items = related[field]
+            objs = {
+                obj.name: obj for obj in self.child._get_or_create_attrs(
+                    model,
+                    [attr for attrs in items if attrs for attr in attrs],
+                )
+            }
+            through = getattr(Recipe, field).through
+            fk = f'{model._meta.model_name}_id'
+            touched = [
+                recipe.id
+                for recipe, attrs in zip(recipes, items) if attrs is not None
+            ]
+            wanted = {
+                (recipe.id, objs[attr['name']].id)
+                for recipe, attrs in zip(recipes, items) if attrs
+                for attr in attrs
+            }
+            current = {}
+            if replace and touched:
+                current = {
+                    (recipe_id, target_id): link_id
+                    for link_id, recipe_id, target_id in through.objects
+                    .filter(recipe_id__in=touched)
+                    .values_list('id', 'recipe_id', fk)
+                }
+            stale = {
+                key: link_id for key, link_id in current.items()
+                if key not in wanted
+            }
+            added = [key for key in wanted if key not in current]
+            if stale:
+                through.objects.filter(id__in=stale.values()).delete()
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{fk: target_id})
+                for recipe_id, target_id in added
+            ])
+            counts = Counter(target_id for _recipe_id, target_id in added)
+            counts.subtract(target_id for _recipe_id, target_id in stale)
+            model.objects.adjust_recipe_counts(counts)
+
+    def create(self, validated_data):
+        """Create many recipes with one insert per table."""
+        related = self._pop_related(validated_data)
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(**item) for item in validated_data]
+        )
+        self._set_related(recipes, related, replace=False)
+        Recipe.objects.filter(
+            id__in=[recipe.id for recipe in recipes],
+        ).update_search_vector()
+
+        return recipes
+
+    def update(self, instances, validated_data):
+        """Update many recipes with one bulk update per table."""
+        related = self._pop_related(validated_data)
+        recipes = []
+        fields = set()
+        for item in validated_data:
+            recipe = instances[item.pop('id')]
+            for attr, value in item.items():
+                setattr(recipe, attr, value)
+                fields.add(attr)
+            recipes.append(recipe)
+        if fields:
+            Recipe.objects.bulk_update(recipes, fields)
+        self._set_related(recipes, related, replace=True)
+        Recipe.objects.filter(
+            id__in=[recipe.id for recipe in recipes],
+        ).update_search_vector()
+
+        return recipes
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """serializer for recipes."""
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
@@ -40,34 +197,53 @@ class RecipeSerializer(serializers.ModelSerializer):
             'ingredients',
         ]
         read_only_fields = ['id']
+        list_serializer_class = RecipeListSerializer
 
-    def _get_or_create_tags(self, tags, recipe):
-        """Handle getting or creating tags as needed."""
+    def _get_or_create_attrs(self, model, attrs):
+        """Get or create the user's tags or ingredients in bulk."""
+        if not attrs:
+            return []
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
+        names = list(dict.fromkeys(attr['name'] for attr in attrs))
+        objs = {
+            obj.name: obj
+            for obj in model.objects.filter(user=auth_user, name__in=names)
+        }
+        missing = [
+            model(user=auth_user, name=name)
+            for name in names if name not in objs
+        ]
+        if missing:
+            created = model.objects.bulk_create(
+                missing,
+                update_conflicts=True,
+                unique_fields=['user', 'name'],
+                update_fields=['name'],
             )
-            recipe.tags.add(tag_obj)
+            objs.update((obj.name, obj) for obj in created)
+
+        return [objs[name] for name in names]
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
+    def _get_or_create_tags(self, tags):
+        """Handle getting or creating tags as needed."""
+        return self._get_or_create_attrs(Tag, tags)
+
+    def _get_or_create_ingredients(self, ingredients):
         """Handle getting or creating ingredients."""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient
-            )
-            recipe.ingredients.add(ingredient_obj)
+        return self._get_or_create_attrs(Ingredient, ingredients)
 
     def create(self, validated_data):
         """create a recipe."""
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        if tags:
+            recipe.tags.add(*self._get_or_create_tags(tags))
+        if ingredients:
+            recipe.ingredients.add(
+                *self._get_or_create_ingredients(ingredients)
+            )
+        bump_cache_version(recipe.user_id)
 
         return recipe
 
@@ -77,25 +253,258 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop('ingredients', None)
 
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_tags(tags))
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            instance.ingredients.set(
+                self._get_or_create_ingredients(ingredients)
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
         instance.save()
+        bump_cache_version(instance.user_id)
 
         return instance
 
 
+class RecipeValuesSerializer:
+    """Render recipe lists from `.values()` rows, as RecipeSerializer would.
+
+    DRF field objects are only used where the database value needs
+    converting (price). Tags and ingredients are loaded with one query
+    each, straight off the link table when only their ids are wanted,
+    and grouped by recipe in Python.
+    """
+    passthrough_fields = (serializers.CharField, serializers.IntegerField)
+
+    def __init__(self, instance=None, many=True, context=None,
+                 fields=None, expand=None, serializer_class=None):
+        self.instance = instance
+        self.fields = (serializer_class or RecipeSerializer)(
+            context=context, fields=fields, expand=expand,
+        ).fields
+
+    def _plan(self):
+        """Return (name, converter, relation expanded or None) per field."""
+        plan = []
+        for name, field in self.fields.items():
+            convert = expanded = None
+            if isinstance(field, serializers.ListSerializer):
+                expanded = True
+            elif isinstance(field, serializers.ManyRelatedField):
+                expanded = False
+            elif not isinstance(field, self.passthrough_fields):
+                convert = field.to_representation
+            plan.append((name, convert, expanded))
+
+        return plan
+
+    def _related_rows(self, name, recipe_ids, expanded):
+        """Return the link rows of a relation for the given recipes."""
+        field = Recipe._meta.get_field(name)
+        model_name = field.related_model._meta.model_name
+        fk = f'{model_name}_id'
+        rows = field.remote_field.through.objects.filter(
+            recipe_id__in=recipe_ids,
+        ).order_by(fk)
+        if expanded:
+            return rows.values_list('recipe_id', fk, f'{model_name}__name')
+
+        return rows.values_list('recipe_id', fk)
+
+    def _group(self, link_rows, recipe_ids, expanded):
+        """Return {recipe id: [rendered item, ...]} from link rows."""
+        grouped = {recipe_id: [] for recipe_id in recipe_ids}
+        if expanded:
+            for recipe_id, pk, attr_name in link_rows:
+                grouped[recipe_id].append({'id': pk, 'name': attr_name})
+        else:
+            for recipe_id, pk in link_rows:
+                grouped[recipe_id].append(pk)
+
+        return grouped
+
+    def _render(self, rows, plan, related):
+        data = []
+        for row in rows:
+            item = {}
+            for name, convert, _expanded in plan:
+                if name in related:
+                    item[name] = related[name][row['id']]
+                    continue
+                value = row[name]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            data.append(item)
+
+        return data
+
+    @property
+    def data(self):
+        rows = list(self.instance)
+        recipe_ids = [row['id'] for row in rows]
+        plan = self._plan()
+        related = {
+            name: self._group(
+                self._related_rows(name, recipe_ids, expanded),
+                recipe_ids,
+                expanded,
+            )
+            for name, _convert, expanded in plan if expanded is not None
+        }
+
+        return self._render(rows, plan, related)
+
+    async def adata(self):
+        """Async version of data, loading rows with the async ORM."""
+        if isinstance(self.instance, QuerySet):
+            rows = [row async for row in self.instance]
+        else:
+            rows = list(self.instance)
+        recipe_ids = [row['id'] for row in rows]
+        plan = self._plan()
+        related = {}
+        for name, _convert, expanded in plan:
+            if expanded is None:
+                continue
+            link_rows = self._related_rows(name, recipe_ids, expanded)
+            related[name] = self._group(
+                [link_row async for link_row in link_rows],
+                recipe_ids,
+                expanded,
+            )
+
+        return self._render(rows, plan, related)
+
+
+class RecipeExportSerializer(RecipeSerializer):
+    """serializer for exported recipes."""
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['description']
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """serializer for recipe detail view."""
+    image_variants = serializers.SerializerMethodField()
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image_variants',
+        ]
+
+    @extend_schema_field({
+        'type': 'object',
+        'additionalProperties': {
+            'type': 'object',
+            'additionalProperties': {'type': 'string', 'format': 'uri'},
+        },
+    })
+    def get_image_variants(self, recipe):
+        """Return URLs of the resized images, keyed by size and format."""
+        request = self.context.get('request')
+        variants = {}
+        for variant, formats in recipe.image_variants.items():
+            variants[variant] = {}
+            for fmt, name in formats.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[variant][fmt] = url
+
+        return variants
+
+
+class RecipeBulkUpdateSerializer(RecipeDetailSerializer):
+    """serializer for one recipe of a bulk update."""
+    id = serializers.IntegerField()
+
+    class Meta(RecipeDetailSerializer.Meta):
+        read_only_fields = []
+        extra_kwargs = {
+            'title': {'required': False},
+            'time_minutes': {'required': False},
+            'price': {'required': False},
+        }
+
+
+class RecipeBulkSerializer(serializers.Serializer):
+    """Serializer for creating, updating and deleting recipes at once."""
+    max_items = 500
+
+    def get_fields(self):
+        """Declare fields here as their names clash with save hooks."""
+        return {
+            'create': RecipeDetailSerializer(
+                many=True, required=False, max_length=self.max_items,
+            ),
+            'update': RecipeBulkUpdateSerializer(
+                many=True, required=False, max_length=self.max_items,
+            ),
+            'delete': serializers.ListField(
+                child=serializers.IntegerField(),
+                required=False,
+                max_length=self.max_items,
+            ),
+        }
+
+    def _check_ids(self, ids, owned, seen=()):
+        """Return errors, keyed by index, for unknown or repeated ids."""
+        errors = {}
+        seen = set(seen)
+        for index, pk in enumerate(ids):
+            if pk not in owned:
+                errors[index] = {'id': [_("Recipe not found.")]}
+            elif pk in seen:
+                errors[index] = {'id': [_("Recipe listed more than once.")]}
+            seen.add(pk)
+
+        return errors
+
+    def validate(self, attrs):
+        """Check every referenced recipe belongs to the user."""
+        auth_user = self.context['request'].user
+        update_ids = [item['id'] for item in attrs.get('update', [])]
+        delete_ids = attrs.get('delete', [])
+        self.recipes = Recipe.objects.filter(user=auth_user).in_bulk(
+            set(update_ids) | set(delete_ids)
+        )
+        errors = {
+            'update': self._check_ids(update_ids, self.recipes),
+            'delete': self._check_ids(delete_ids, self.recipes, update_ids),
+        }
+        errors = {key: value for key, value in errors.items() if value}
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
+    def create(self, validated_data):
+        """Apply the whole batch in one transaction."""
+        user = validated_data.pop('user')
+        with transaction.atomic():
+            created = self.fields['create'].create([
+                {**item, 'user': user}
+                for item in validated_data.get('create', [])
+            ])
+            updated = self.fields['update'].update(
+                self.recipes, validated_data.get('update', []),
+            )
+            deleted = validated_data.get('delete', [])
+            if deleted:
+                Recipe.objects.filter(id__in=deleted).delete()
+
+        recipes = Recipe.objects.prefetch_related(
+            'tags', 'ingredients',
+        ).in_bulk([recipe.id for recipe in created + updated])
+
+        return {
+            'create': [recipes[recipe.id] for recipe in created],
+            'update': [recipes[recipe.id] for recipe in updated],
+            'delete': deleted,
+        }
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
@@ -0,0 +1,95 @@
+"""
+Signal handlers for the recipe app.
+"""
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+
+@receiver(post_save, sender=Recipe)
+def update_saved_recipe_search_vector(sender, instance, update_fields=None,
+                                      **kwargs):
+    """Keep the search vector in step with the recipe text."""
+    if update_fields is not None and not (
+            {'title', 'description'} & set(update_fields)):
+        return
+    Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_linked_recipe_search_vector(sender, instance, action, reverse,
+                                       pk_set, **kwargs):
+    """Refresh search vectors when tags or ingredients are linked."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.objects.filter(pk=instance.pk).update_search_vector()
+        return
+
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_recipe_ids', [])
+    if action in ('post_add', 'post_remove', 'post_clear') and pk_set:
+        Recipe.objects.filter(pk__in=pk_set).update_search_vector()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_linked_attr_recipe_count(sender, instance, action, reverse,
+                                    model, pk_set, **kwargs):
+    """Keep recipe counts in step with links made through the managers.
+
+    Counts go down before links are removed, for the links that exist,
+    in the same transaction as the removal.
+    """
+    attr_model = type(instance) if reverse else model
+    field = attr_model._meta.model_name
+    if reverse:
+        links = sender.objects.filter(**{field: instance})
+        if action == 'post_add':
+            changed = len(pk_set)
+        elif action == 'pre_remove':
+            changed = -links.filter(recipe_id__in=pk_set).count()
+        elif action == 'pre_clear':
+            changed = -links.count()
+        else:
+            return
+        if changed:
+            attr_model.objects.filter(pk=instance.pk).update(
+                recipe_count=F('recipe_count') + changed,
+            )
+        return
+
+    if action == 'post_add':
+        attrs = attr_model.objects.filter(pk__in=pk_set)
+    elif action == 'pre_remove':
+        attrs = attr_model.objects.filter(pk__in=pk_set, recipe=instance)
+    elif action == 'pre_clear':
+        attrs = attr_model.objects.filter(recipe=instance)
+    else:
+        return
+    step = 1 if action == 'post_add' else -1
+    attrs.update(recipe_count=F('recipe_count') + step)
+
+
+def _recipes_using(instance):
+    if isinstance(instance, Tag):
+        return Recipe.objects.filter(tags=instance)
+    return Recipe.objects.filter(ingredients=instance)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_renamed_attr_search_vector(sender, instance, created, **kwargs):
+    """Refresh search vectors of recipes using a renamed attribute."""
+    if not created:
+        _recipes_using(instance).update_search_vector()
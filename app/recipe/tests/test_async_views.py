@@ -0,0 +1,221 @@
+"""
+Tests for the async read views.
+"""
+import importlib
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.conf import settings
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import clear_url_caches, resolve, reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import views
+from recipe.async_views import async_read_path
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+recipe_list_view = async_read_path(
+    r'^recipes/$', views.RecipeViewset, 'recipe',
+    {'get': 'list', 'post': 'create'},
+).callback
+recipe_detail_view = async_read_path(
+    r'^recipes/(?P<pk>[0-9]+)/$', views.RecipeViewset, 'recipe',
+    {'get': 'retrieve', 'patch': 'partial_update'},
+    detail=True,
+).callback
+tag_list_view = async_read_path(
+    r'^tags/$', views.TagViewset, 'tag', {'get': 'list'},
+).callback
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class AsyncReadViewTests(TestCase):
+    """Test the async views answer as the sync viewsets do."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.factory = AsyncRequestFactory()
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10 + i,
+                price=Decimal('4.50'),
+            )
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'I{i}'),
+            )
+        self.recipe = recipe
+
+    def _call(self, view, method, path, data=None, token=True, **kwargs):
+        headers = {}
+        if token:
+            headers['authorization'] = f'Token {self.token.key}'
+        request = getattr(self.factory, method)(
+            path, data, headers=headers, **(
+                {'content_type': 'application/json'}
+                if method != 'get' else {}
+            ),
+        )
+        return async_to_sync(view)(request, **kwargs)
+
+    def _assert_same(self, view, path, data=None, **kwargs):
+        expected = self.client.get(path, data)
+        cache.clear()
+
+        res = self._call(view, 'get', path, data, **kwargs)
+
+        self.assertEqual(res.status_code, expected.status_code)
+        self.assertEqual(res.content, expected.content)
+        self.assertEqual(res['Content-Type'], expected['Content-Type'])
+
+    def test_recipe_list(self):
+        """Test listing recipes matches the sync view."""
+        self._assert_same(recipe_list_view, RECIPE_URL)
+
+    def test_recipe_list_paginated_sparse(self):
+        """Test paging and sparse fields match the sync view."""
+        self._assert_same(
+            recipe_list_view,
+            RECIPE_URL,
+            {'page_size': 2, 'fields': 'id,title,tags', 'expand': 'tags'},
+        )
+
+    def test_recipe_list_cached(self):
+        """Test the async and sync lists share cache entries and ETags."""
+        expected = self.client.get(RECIPE_URL)
+
+        res = self._call(recipe_list_view, 'get', RECIPE_URL)
+
+        self.assertEqual(res['ETag'], expected['ETag'])
+        self.assertEqual(res.content, expected.content)
+
+    def test_recipe_list_bad_param(self):
+        """Test invalid params are rejected as by the sync view."""
+        self._assert_same(recipe_list_view, RECIPE_URL, {'match': 'some'})
+
+    def test_recipe_detail(self):
+        """Test retrieving a recipe matches the sync view."""
+        self._assert_same(
+            recipe_detail_view,
+            detail_url(self.recipe.id),
+            pk=str(self.recipe.id),
+        )
+
+    def test_recipe_detail_other_user(self):
+        """Test other users' recipes are not found."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        recipe = Recipe.objects.create(
+            user=other, title='Other', time_minutes=5, price=Decimal('1.00'),
+        )
+
+        res = self._call(
+            recipe_detail_view, 'get', detail_url(recipe.id),
+            pk=str(recipe.id),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_list(self):
+        """Test listing tags matches the sync view."""
+        self._assert_same(tag_list_view, TAGS_URL)
+
+    def test_tag_list_serializer_built_once(self):
+        """Test lists without an async serializer build it only once."""
+        with patch.object(
+            views.TagViewset, 'get_serializer', autospec=True,
+            side_effect=views.TagViewset.get_serializer,
+        ) as get_serializer:
+            res = self._call(tag_list_view, 'get', TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(res.content)), 3)
+        get_serializer.assert_called_once()
+
+    def test_auth_required(self):
+        """Test requests without a token are rejected."""
+        res = self._call(recipe_list_view, 'get', RECIPE_URL, token=False)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    def test_invalid_token(self):
+        """Test unknown tokens are rejected."""
+        request = self.factory.get(
+            RECIPE_URL, headers={'authorization': 'Token nope'},
+        )
+
+        res = async_to_sync(recipe_list_view)(request)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_writes_use_sync_view(self):
+        """Test other methods are served by the sync viewset."""
+        res = self._call(
+            recipe_detail_view, 'patch', detail_url(self.recipe.id),
+            {'title': 'Renamed'}, pk=str(self.recipe.id),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Renamed')
+
+
+class AsyncReadRoutingTests(SimpleTestCase):
+    """Test the async routes leave the other recipe routes alone."""
+
+    def _reload_urls(self):
+        importlib.reload(importlib.import_module('recipe.urls'))
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    def setUp(self):
+        with override_settings(ASYNC_READ_VIEWS=True):
+            self._reload_urls()
+        self.addCleanup(self._reload_urls)
+
+    def test_list_actions_resolve(self):
+        """Test export and bulk still reach the viewset actions."""
+        for name, action in (('recipe-export', 'export'),
+                             ('recipe-bulk', 'bulk')):
+            match = resolve(reverse(f'recipe:{name}'))
+
+            self.assertEqual(match.url_name, name)
+            self.assertIn(action, match.func.actions.values())
+
+    def test_read_routes_async(self):
+        """Test the list and detail routes use the async view."""
+        for url in (reverse('recipe:recipe-list'), detail_url(1)):
+            match = resolve(url)
+
+            self.assertEqual(match.func.view_class.__name__, 'AsyncReadView')
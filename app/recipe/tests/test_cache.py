@@ -0,0 +1,138 @@
+"""
+Tests for caching of the recipe APIs.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """create and return a new user with given defaults."""
+    return get_user_model().objects.create_user(
+        email=email,
+        password=password,
+    )
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ListCacheTests(TestCase):
+    """Test caching of list responses."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request does not hit the database."""
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPE_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+
+    def test_query_params_cached_separately(self):
+        """Test lists with different filters are cached apart."""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        create_recipe(user=self.user)
+
+        res_all = self.client.get(RECIPE_URL)
+        res_tag = self.client.get(RECIPE_URL, {'tags': str(tag.id)})
+
+        self.assertEqual(len(res_all.data), 2)
+        self.assertEqual(len(res_tag.data), 1)
+
+    def test_write_invalidates_cache(self):
+        """Test writing through the API refreshes cached lists."""
+        self.client.get(RECIPE_URL)
+        payload = {
+            'title': 'new recipe',
+            'time_minutes': 5,
+            'price': Decimal('1.00'),
+        }
+        self.client.post(RECIPE_URL, payload)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_tag_write_invalidates_recipe_cache(self):
+        """Test renaming a tag refreshes cached recipe lists."""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        self.client.get(RECIPE_URL)
+
+        url = reverse('recipe:tag-detail', args=[tag.id])
+        self.client.patch(url, {'name': 'Vegetarian'})
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data[0]['tags'][0]['name'], 'Vegetarian')
+
+    def test_cache_limited_to_user(self):
+        """Test cached lists are not shared between users."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        other_client = APIClient()
+        other_client.force_authenticate(create_user('other@example.com'))
+
+        res = other_client.get(TAGS_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_etag_not_modified(self):
+        """Test a matching If-None-Match returns 304 without queries."""
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPE_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_after_write(self):
+        """Test the ETag no longer matches once data changed."""
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+        self.client.patch(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'title': 'new title'},
+        )
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
@@ -1,7 +1,7 @@
 """
 Tests for the ingredients APIs.
 """
-# from decimal import Decimal
+from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
@@ -11,10 +11,10 @@ from rest_framework.test import APIClient
 
 from core.models import (
     Ingredient,
-    # Recipe
+    Recipe,
 )
 
-from recipe.serializers import IngredientSerializer
+from recipe.serializers import IngredientUsageSerializer
 
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
@@ -61,7 +61,7 @@ class PrivateIngredientAPITest(TestCase):
 
         res = self.client.get(INGREDIENTS_URL)
         ingredients = Ingredient.objects.all().order_by('-name')
-        serializer = IngredientSerializer(ingredients, many=True)
+        serializer = IngredientUsageSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
@@ -108,44 +108,87 @@ class PrivateIngredientAPITest(TestCase):
         ingredients = Ingredient.objects.filter(user=self.user)
         self.assertFalse(ingredients.exists())
 
-    # def test_filter_ingredients_assigned_to_recipes(self):
-    #     """Test listing ingrefients to those assigned to recipes."""
-    #     in1 = Ingredient.objects.create(user=self.user, name="apple")
-    #     in2 = Ingredient.objects.create(user=self.user, name="orange")
-    #     recipe = Recipe.objects.create(
-    #         title='salad',
-    #         time_minutes=5,
-    #         price=Decimal('4.50'),
-    #         user=self.user
-    #     )
-    #     recipe.ingredients.add(in1)
-
-    #     res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
-
-    #     s1 = IngredientSerializer(in1)
-    #     s2 = IngredientSerializer(in2)
-    #     self.assertIn(s1.data, res.data)
-    #     self.assertNotIn(s2.data, res.data)
-
-    # def test_filter_ingredients_unique(self):
-    #     """Test filter ingredients returns a unique list."""
-    #     ing = Ingredient.objects.create(user=self.user, name='eggs')
-    #     Ingredient.objects.create(user=self.user, name='carrot')
-    #     r1 = Recipe.objects.create(
-    #         title='scrambled eggs',
-    #         time_minutes=5,
-    #         price=Decimal('2.50'),
-    #         user=self.user
-    #     )
-    #     r2 = Recipe.objects.create(
-    #         title='herb eggs',
-    #         time_minutes=15,
-    #         price=Decimal('1.50'),
-    #         user=self.user
-    #     )
-    #     r1.ingredients.add(ing)
-    #     r2.ingredients.add(ing)
-
-    #     res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
-
-    #     self.assertEqual(len(res.data), 1)
+    def test_list_ingredients_cursor_pagination(self):
+        """Test paging through ingredients with a cursor."""
+        for name in ['Kale', 'Salt', 'Vanilla']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(INGREDIENTS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        names = [item['name'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [item['name'] for item in res.data['results']]
+
+        self.assertIsNone(res.data['next'])
+        self.assertEqual(names, ['Vanilla', 'Salt', 'Kale'])
+
+    def test_autocomplete_ingredients(self):
+        """Test q returns the user's ingredients starting with it."""
+        for name in ['salt', 'Sage', 'Basil', 'Sea salt']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(INGREDIENTS_URL, {'q': 'sa', 'page_size': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [item['name'] for item in res.data]
+        self.assertEqual(names, ['Sage', 'salt'])
+
+    def test_autocomplete_ingredients_by_usage(self):
+        """Test q with ordering=usage returns the most used matches."""
+        for name, count in [('Salt', 1), ('Sage', 0), ('Sugar', 4)]:
+            Ingredient.objects.create(
+                user=self.user, name=name, recipe_count=count,
+            )
+
+        res = self.client.get(
+            INGREDIENTS_URL, {'q': 's', 'ordering': 'usage', 'limit': 2},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [item['name'] for item in res.data]
+        self.assertEqual(names, ['Sugar', 'Salt'])
+
+    def test_filter_ingredients_assigned_to_recipes(self):
+        """Test listing ingrefients to those assigned to recipes."""
+        in1 = Ingredient.objects.create(user=self.user, name="apple")
+        in2 = Ingredient.objects.create(user=self.user, name="orange")
+        recipe = Recipe.objects.create(
+            title='salad',
+            time_minutes=5,
+            price=Decimal('4.50'),
+            user=self.user
+        )
+        recipe.ingredients.add(in1)
+
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        in1.refresh_from_db()
+        s1 = IngredientUsageSerializer(in1)
+        s2 = IngredientUsageSerializer(in2)
+        self.assertIn(s1.data, res.data)
+        self.assertNotIn(s2.data, res.data)
+
+    def test_filter_ingredients_unique(self):
+        """Test filter ingredients returns a unique list."""
+        ing = Ingredient.objects.create(user=self.user, name='eggs')
+        Ingredient.objects.create(user=self.user, name='carrot')
+        r1 = Recipe.objects.create(
+            title='scrambled eggs',
+            time_minutes=5,
+            price=Decimal('2.50'),
+            user=self.user
+        )
+        r2 = Recipe.objects.create(
+            title='herb eggs',
+            time_minutes=15,
+            price=Decimal('1.50'),
+            user=self.user
+        )
+        r1.ingredients.add(ing)
+        r2.ingredients.add(ing)
+
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data), 1)
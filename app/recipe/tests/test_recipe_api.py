@@ -2,16 +2,30 @@
 Test for recipe APIs.
 """
 from decimal import Decimal
+import csv
+import json
 import tempfile
 import os
+import threading
+import time
+from io import StringIO
+from unittest.mock import patch
 
 from PIL import Image
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.core.files.storage import default_storage
+from django.test import AsyncClient, TestCase, override_settings
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from core.models import (
@@ -19,13 +33,17 @@ from core.models import (
     Tag,
     Ingredient,
 )
+from recipe import images
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
+    RecipeValuesSerializer,
 )
 
 
 RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def detail_url(recipe_id):
@@ -404,6 +422,56 @@ class PrivateRecipeAPITest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.all().count(), 0)
 
+    def _create_recipe_queries(self, count):
+        """Return the queries run to create a recipe with count attrs."""
+        payload = {
+            'title': 'Big salad',
+            'time_minutes': 10,
+            'price': Decimal('8.50'),
+            'tags': [{'name': f'tag {i}'} for i in range(count)],
+            'ingredients': [{'name': f'ing {i}'} for i in range(count)],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return len(ctx.captured_queries)
+
+    def test_create_recipe_query_count_constant(self):
+        """Test creating tags and ingredients is done in bulk."""
+        Tag.objects.create(user=self.user, name='tag 0')
+        Ingredient.objects.create(user=self.user, name='ing 1')
+
+        self.assertEqual(
+            self._create_recipe_queries(2),
+            self._create_recipe_queries(30),
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(),
+            30,
+        )
+
+    def test_update_recipe_tags_keeps_unchanged_links(self):
+        """Test updating tags only touches the links that changed."""
+        recipe = create_recipe(user=self.user)
+        tag_keep = Tag.objects.create(user=self.user, name='keep')
+        tag_drop = Tag.objects.create(user=self.user, name='drop')
+        recipe.tags.add(tag_keep, tag_drop)
+        link = Recipe.tags.through.objects.get(recipe=recipe, tag=tag_keep)
+
+        payload = {'tags': [{'name': 'keep'}, {'name': 'new'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['keep', 'new'],
+        )
+        self.assertTrue(
+            Recipe.tags.through.objects.filter(id=link.id).exists()
+        )
+
     def test_filter_by_tags(self):
         """Test filtering recipes by tags."""
         r1 = create_recipe(user=self.user, title='Thai food 1')
@@ -444,7 +512,677 @@ class PrivateRecipeAPITest(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_filter_by_tags_returns_unique_recipes(self):
+        """Test a recipe matching several tags is only listed once."""
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        recipe.tags.add(tag1, tag2)
+
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]['id'], recipe.id)
+
+    def test_filter_by_tags_match_all(self):
+        """Test filtering recipes having all of the given tags."""
+        r1 = create_recipe(user=self.user, title='Vegan dinner')
+        r2 = create_recipe(user=self.user, title='Vegan lunch')
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        r1.tags.add(tag1, tag2)
+        r2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [r1.id])
+
+    def test_filter_by_ingredients_match_all(self):
+        """Test filtering recipes having all of the given ingredients."""
+        r1 = create_recipe(user=self.user, title='Lemonade')
+        r2 = create_recipe(user=self.user, title='Lemon water')
+        in1 = Ingredient.objects.create(user=self.user, name='Lemon')
+        in2 = Ingredient.objects.create(user=self.user, name='Sugar')
+        r1.ingredients.add(in1, in2)
+        r2.ingredients.add(in1)
+
+        params = {'ingredients': f'{in1.id},{in2.id}', 'match': 'all'}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [r1.id])
+
+    def test_filter_invalid_match_error(self):
+        """Test an unknown match value returns an error."""
+        res = self.client.get(RECIPE_URL, {'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes(self):
+        """Test searching recipes by title, tags and ingredients."""
+        r1 = create_recipe(user=self.user, title='Chicken curry',
+                           description='Spicy and rich.')
+        r2 = create_recipe(user=self.user, title='Rice bowl',
+                           description='Goes well with a curry.')
+        r3 = create_recipe(user=self.user, title='Pancakes',
+                           description='Sweet breakfast.')
+        r3.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='chicken eggs')
+        )
+        create_recipe(user=self.user, title='Fruit salad')
+
+        res = self.client.get(RECIPE_URL, {'search': 'chicken curry'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [r1.id])
+
+        res = self.client.get(RECIPE_URL, {'search': 'curries'})
+
+        self.assertEqual([r['id'] for r in res.data], [r1.id, r2.id])
+
+        res = self.client.get(RECIPE_URL, {'search': 'chicken'})
+
+        self.assertEqual([r['id'] for r in res.data], [r1.id, r3.id])
+
+    def test_search_limited_to_user(self):
+        """Test search only returns the authenticated user's recipes."""
+        other_user = create_user(email='other@example.com',
+                                 password='testpass123')
+        create_recipe(user=other_user, title='Chicken curry')
+
+        res = self.client.get(RECIPE_URL, {'search': 'curry'})
+
+        self.assertEqual(res.data, [])
+
+    def test_search_follows_tag_changes(self):
+        """Test search sees tags added through the API and renamed."""
+        recipe = create_recipe(user=self.user, title='Lunch')
+        payload = {'tags': [{'name': 'Vegan'}]}
+        self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        res = self.client.get(RECIPE_URL, {'search': 'vegan'})
+
+        self.assertEqual([r['id'] for r in res.data], [recipe.id])
+
+        tag = Tag.objects.get(user=self.user, name='Vegan')
+        url = reverse('recipe:tag-detail', args=[tag.id])
+        self.client.patch(url, {'name': 'Keto'})
+
+        res = self.client.get(RECIPE_URL, {'search': 'vegan'})
+        self.assertEqual(res.data, [])
+        res = self.client.get(RECIPE_URL, {'search': 'keto'})
+        self.assertEqual([r['id'] for r in res.data], [recipe.id])
+
+    def test_search_follows_attr_deletes(self):
+        """Test search forgets deleted tags and ingredients."""
+        recipe = create_recipe(user=self.user, title='Lunch')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Kale'),
+        )
+
+        tag = Tag.objects.get(user=self.user, name='Vegan')
+        self.client.delete(reverse('recipe:tag-detail', args=[tag.id]))
+        Ingredient.objects.filter(user=self.user).delete()
+
+        for search in ['vegan', 'kale']:
+            res = self.client.get(RECIPE_URL, {'search': search})
+            self.assertEqual(res.data, [])
+
+    def test_bulk_attr_delete_query_count_constant(self):
+        """Test deleting many tags refreshes their recipes in one go."""
+        counts = []
+        for size in (2, 20):
+            for i in range(size):
+                create_recipe(user=self.user).tags.add(
+                    Tag.objects.create(user=self.user, name=f'tag {i}'),
+                )
+            with CaptureQueriesContext(connection) as ctx:
+                Tag.objects.filter(user=self.user).delete()
+            counts.append(len(ctx))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_search_paginated_by_rank(self):
+        """Test paging through search results keeps the rank order."""
+        r1 = create_recipe(user=self.user, title='Curry',
+                           description='curry curry')
+        r2 = create_recipe(user=self.user, title='Curry')
+        r3 = create_recipe(user=self.user, title='Rice',
+                           description='with curry')
+
+        res = self.client.get(RECIPE_URL, {'search': 'curry', 'page_size': 2})
+        ids = [r['id'] for r in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [r['id'] for r in res.data['results']]
+
+        self.assertEqual(ids, [r1.id, r2.id, r3.id])
+
+    def _create_recipes_with_attrs(self, count):
+        """Create recipes which each have a tag and an ingredient."""
+        for i in range(count):
+            recipe = create_recipe(user=self.user, title=f'recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'tag {i}')
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'ing {i}')
+            )
+
+    def test_list_recipes_query_count(self):
+        """Test listing recipes does not run a query per recipe."""
+        self._create_recipes_with_attrs(5)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 5)
+
+    def test_filter_recipes_query_count(self):
+        """Test filtering recipes does not run a query per recipe."""
+        self._create_recipes_with_attrs(5)
+        tag_ids = ','.join(str(t.id) for t in Tag.objects.all())
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPE_URL, {'tags': tag_ids})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 5)
+
+    def test_recipe_detail_query_count(self):
+        """Test recipe detail loads tags and ingredients up front."""
+        self._create_recipes_with_attrs(1)
+        recipe = Recipe.objects.get(user=self.user)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 1)
+
+    def test_list_recipes_sparse_fields(self):
+        """Test fields limits the response and skips unused tables."""
+        self._create_recipes_with_attrs(2)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [set(item) for item in res.data], [{'id', 'title'}] * 2,
+        )
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql']
+        self.assertNotIn('description', sql)
+        self.assertNotIn('core_recipe_tags', sql)
+
+    def test_list_recipes_fields_related_ids(self):
+        """Test relations not expanded are returned as ids."""
+        self._create_recipes_with_attrs(1)
+        recipe = Recipe.objects.get(user=self.user)
+        tag = recipe.tags.get()
+        ingredient = recipe.ingredients.get()
+
+        res = self.client.get(RECIPE_URL, {
+            'fields': 'id,tags,ingredients',
+            'expand': 'ingredients',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+        self.assertEqual(
+            res.data[0]['ingredients'],
+            [{'id': ingredient.id, 'name': ingredient.name}],
+        )
+
+    def test_recipe_detail_sparse_fields(self):
+        """Test fields works on the detail view too."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(
+            detail_url(recipe.id), {'fields': 'title,description'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'title': recipe.title,
+            'description': recipe.description,
+        })
+
+    def test_list_recipes_unknown_field_error(self):
+        """Test unknown fields or relations return an error."""
+        res = self.client.get(RECIPE_URL, {'fields': 'id,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPE_URL, {'expand': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_recipes_unpaginated_by_default(self):
+        """Test recipes are returned as a plain list without page params."""
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_list_recipes_cursor_pagination(self):
+        """Test paging through recipes with a cursor."""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+        ids = [r['id'] for r in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [r['id'] for r in res.data['results']]
+
+        expected = sorted((r.id for r in recipes), reverse=True)
+        self.assertEqual(ids, expected)
+
+
+class RecipeValuesSerializerTests(TestCase):
+    """Test the list fast path renders exactly like RecipeSerializer."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        late_tag = Tag.objects.create(user=self.user, name='Zest')
+        early_tag = Tag.objects.create(user=self.user, name='Ärger')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = create_recipe(
+            user=self.user, title='Crème brûlée', price=Decimal('5.00'),
+        )
+        recipe.tags.add(late_tag)
+        recipe.tags.add(early_tag)
+        recipe.ingredients.add(salt)
+        create_recipe(user=self.user, link='', price=Decimal('0.50'))
+
+    def _render_both(self, fields=None, expand=None):
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        instances = recipes.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch(
+                'ingredients', queryset=Ingredient.objects.order_by('id'),
+            ),
+        )
+        expected = RecipeSerializer(
+            instances, many=True, fields=fields, expand=expand,
+        ).data
+        rows = recipes.values('id', 'title', 'time_minutes', 'price', 'link')
+        actual = RecipeValuesSerializer(
+            rows, many=True, fields=fields, expand=expand,
+        ).data
+
+        return JSONRenderer().render(expected), JSONRenderer().render(actual)
+
+    def test_output_identical(self):
+        """Test the default list output is byte for byte the same."""
+        expected, actual = self._render_both()
+
+        self.assertEqual(actual, expected)
+
+    def test_sparse_output_identical(self):
+        """Test sparse fields and id-only relations render the same."""
+        for fields, expand in [
+            (['id', 'title'], []),
+            (['price', 'tags', 'ingredients'], []),
+            (['link', 'tags', 'ingredients'], ['tags']),
+        ]:
+            with self.subTest(fields=fields, expand=expand):
+                expected, actual = self._render_both(fields, expand)
+
+                self.assertEqual(actual, expected)
+
+
+class ExportRecipeAPITests(TestCase):
+    """Test streaming exports of a user's recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_recipe(user=self.user, title=f'recipe {i}')
+            for i in range(5)
+        ]
+        self.recipes[0].tags.add(
+            Tag.objects.create(user=self.user, name='Dinner'),
+            Tag.objects.create(user=self.user, name='Vegan'),
+        )
+        self.recipes[0].ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Kale'),
+        )
+        other_user = create_user(email='other@example.com', password='123')
+        create_recipe(user=other_user)
+
+    def test_export_ndjson(self):
+        """Test exporting streams one JSON recipe per line."""
+        with patch('recipe.views.RecipeViewset.export_chunk_size', 2):
+            res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        items = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [item['id'] for item in items],
+            [recipe.id for recipe in reversed(self.recipes)],
+        )
+        self.assertEqual(items[-1]['description'], 'sample description...')
+        self.assertEqual(
+            [tag['name'] for tag in items[-1]['tags']], ['Dinner', 'Vegan'],
+        )
+
+    async def test_export_async_under_asgi(self):
+        """Test ASGI requests stream chunks read through sync_to_async."""
+        token = await Token.objects.acreate(user=self.user)
+        headers = {'authorization': f'Token {token.key}'}
+
+        with patch('recipe.views.RecipeViewset.export_chunk_size', 2):
+            res = await AsyncClient().get(EXPORT_URL, headers=headers)
+            chunks = [chunk async for chunk in res.streaming_content]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.is_async)
+        self.assertEqual(len(chunks), 3)
+        items = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        self.assertEqual(
+            [item['id'] for item in items],
+            [recipe.id for recipe in reversed(self.recipes)],
+        )
+
+    def test_export_csv(self):
+        """Test exporting as CSV joins tags and ingredients into cells."""
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        self.assertIn('recipes.csv', res['Content-Disposition'])
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(content.splitlines()))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[-1]['tags'], 'Dinner|Vegan')
+        self.assertEqual(rows[-1]['ingredients'], 'Kale')
+        self.assertEqual(rows[-1]['price'], '5.25')
+
+    def test_export_filtered_fields(self):
+        """Test exports accept the list filters and sparse fields."""
+        tag = Tag.objects.get(name='Dinner')
+
+        res = self.client.get(EXPORT_URL, {
+            'tags': tag.id, 'fields': 'id,title',
+        })
+
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{'id': self.recipes[0].id, 'title': 'recipe 0'}],
+        )
+
+
+class BulkRecipeAPITests(TestCase):
+    """Test the bulk recipe API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com',
+                                password='testpass123')
+        self.client.force_authenticate(self.user)
+
+    def _recipe_payload(self, i, **params):
+        """Return a payload for a new recipe."""
+        payload = {
+            'title': f'recipe {i}',
+            'time_minutes': 10,
+            'price': Decimal('3.50'),
+            'tags': [{'name': 'Dinner'}, {'name': f'tag {i}'}],
+            'ingredients': [{'name': f'ing {i}'}],
+        }
+        payload.update(params)
+        return payload
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes with nested tags at once."""
+        Tag.objects.create(user=self.user, name='Dinner')
+        payload = {'create': [self._recipe_payload(i) for i in range(3)]}
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['create']), 3)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [r['id'] for r in res.data['create']],
+            [r.id for r in recipes],
+        )
+        for recipe, item in zip(recipes, payload['create']):
+            self.assertEqual(recipe.title, item['title'])
+            self.assertEqual(
+                sorted(recipe.tags.values_list('name', flat=True)),
+                sorted(tag['name'] for tag in item['tags']),
+            )
+            self.assertEqual(recipe.ingredients.count(), 1)
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name='Dinner').count(),
+            1,
+        )
+
+    def test_bulk_create_searchable(self):
+        """Test recipes created in bulk can be searched."""
+        payload = {'create': [self._recipe_payload('curry')]}
+        self.client.post(BULK_URL, payload, format='json')
 
+        res = self.client.get(RECIPE_URL, {'search': 'curry'})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_bulk_create_query_count_constant(self):
+        """Test a bulk create costs the same queries for any batch size."""
+        counts = []
+        for size in (2, 20):
+            payload = {
+                'create': [
+                    self._recipe_payload(f'{size}-{i}') for i in range(size)
+                ],
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_delete_query_count_constant(self):
+        """Test a bulk delete costs the same queries for any batch size."""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        counts = []
+        for size in (2, 40):
+            recipes = [create_recipe(user=self.user) for _ in range(size)]
+            tag.recipe_set.add(*recipes)
+            payload = {'delete': [recipe.id for recipe in recipes]}
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
+
+    def test_bulk_update_and_delete_recipes(self):
+        """Test updating and deleting recipes in one request."""
+        r1 = create_recipe(user=self.user, title='old title')
+        r2 = create_recipe(user=self.user)
+        tag_keep = Tag.objects.create(user=self.user, name='keep')
+        tag_drop = Tag.objects.create(user=self.user, name='drop')
+        r1.tags.add(tag_keep, tag_drop)
+        payload = {
+            'update': [{
+                'id': r1.id,
+                'title': 'new title',
+                'tags': [{'name': 'keep'}, {'name': 'new'}],
+            }],
+            'delete': [r2.id],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['update'][0]['title'], 'new title')
+        self.assertEqual(res.data['delete'], [r2.id])
+        r1.refresh_from_db()
+        self.assertEqual(r1.title, 'new title')
+        self.assertEqual(r1.time_minutes, 22)
+        self.assertEqual(
+            sorted(r1.tags.values_list('name', flat=True)),
+            ['keep', 'new'],
+        )
+        self.assertFalse(Recipe.objects.filter(id=r2.id).exists())
+
+    def test_bulk_other_users_recipe_error(self):
+        """Test the batch is rejected if it touches another user recipe."""
+        other_user = create_user(email='other@example.com',
+                                 password='testpass123')
+        other_recipe = create_recipe(user=other_user)
+        payload = {
+            'create': [self._recipe_payload(1)],
+            'delete': [other_recipe.id],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data['delete'][0])
+        self.assertTrue(Recipe.objects.filter(id=other_recipe.id).exists())
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_update_and_delete_same_recipe_error(self):
+        """Test a recipe cannot be updated and deleted in one batch."""
+        recipe = create_recipe(user=self.user)
+        payload = {
+            'update': [{'id': recipe.id, 'title': 'new title'}],
+            'delete': [recipe.id],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(0, res.data['delete'])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_invalid_item_errors(self):
+        """Test errors are reported per item and nothing is written."""
+        payload = {
+            'create': [
+                self._recipe_payload(1),
+                self._recipe_payload(2, time_minutes='soon'),
+            ],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn(0, res.data['create'])
+        self.assertIn('time_minutes', res.data['create'][1])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+
+class RecipeCountTests(TestCase):
+    """Test tags and ingredients count the recipes using them."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com',
+                                password='testpass123')
+        self.client.force_authenticate(self.user)
+
+    def _counts(self, model):
+        return dict(model.objects.filter(
+            user=self.user,
+        ).values_list('name', 'recipe_count'))
+
+    def test_counts_follow_recipe_writes(self):
+        """Test creating, updating and deleting recipes moves counts."""
+        payload = {
+            'title': 'Curry', 'time_minutes': 30, 'price': '5.00',
+            'tags': [{'name': 'Dinner'}, {'name': 'Spicy'}],
+            'ingredients': [{'name': 'Rice'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+        self.client.post(RECIPE_URL, {
+            **payload, 'title': 'Stew', 'tags': [{'name': 'Dinner'}],
+        }, format='json')
+        self.assertEqual(self._counts(Tag), {'Dinner': 2, 'Spicy': 1})
+        self.assertEqual(self._counts(Ingredient), {'Rice': 2})
+
+        self.client.patch(detail_url(res.data['id']), {
+            'tags': [{'name': 'Spicy'}, {'name': 'Vegan'}],
+        }, format='json')
+        self.assertEqual(
+            self._counts(Tag), {'Dinner': 1, 'Spicy': 1, 'Vegan': 1},
+        )
+
+        self.client.delete(detail_url(res.data['id']))
+        self.assertEqual(
+            self._counts(Tag), {'Dinner': 1, 'Spicy': 0, 'Vegan': 0},
+        )
+        self.assertEqual(self._counts(Ingredient), {'Rice': 1})
+
+    def test_counts_follow_related_managers(self):
+        """Test links made from either side of the relation are counted."""
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+
+        tag.recipe_set.add(r1, r2)
+        r1.tags.add(tag)
+        self.assertEqual(self._counts(Tag), {'Dinner': 2})
+
+        r1.tags.remove(tag)
+        tag.recipe_set.remove(r1)
+        self.assertEqual(self._counts(Tag), {'Dinner': 1})
+
+        tag.recipe_set.clear()
+        self.assertEqual(self._counts(Tag), {'Dinner': 0})
+        r1.tags.set([tag])
+        r1.tags.clear()
+        self.assertEqual(self._counts(Tag), {'Dinner': 0})
+
+    def test_counts_follow_bulk_writes(self):
+        """Test bulk creates, updates and deletes move counts."""
+        payload = {'create': [
+            {
+                'title': f'recipe {i}', 'time_minutes': 10, 'price': '3.50',
+                'tags': [{'name': 'Dinner'}, {'name': f'tag {i}'}],
+            }
+            for i in range(3)
+        ]}
+        res = self.client.post(BULK_URL, payload, format='json')
+        ids = [item['id'] for item in res.data['create']]
+        self.assertEqual(self._counts(Tag), {
+            'Dinner': 3, 'tag 0': 1, 'tag 1': 1, 'tag 2': 1,
+        })
+
+        self.client.post(BULK_URL, {
+            'update': [{'id': ids[0], 'tags': [{'name': 'tag 1'}]}],
+            'delete': [ids[2]],
+        }, format='json')
+
+        self.assertEqual(self._counts(Tag), {
+            'Dinner': 1, 'tag 0': 0, 'tag 1': 2, 'tag 2': 0,
+        })
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0)
 class ImageUploadTests(TestCase):
     """Test for the image upload API."""
 
@@ -458,8 +1196,23 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        for formats in self.recipe.image_variants.values():
+            for name in formats.values():
+                default_storage.delete(name)
         self.recipe.image.delete()
 
+    def _upload_image(self, size=(10, 10), color='black', recipe=None):
+        """Upload a JPEG of the given size to the recipe."""
+        url = image_upload_url((recipe or self.recipe).id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', size, color)
+            img.save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.post(
+                url, {'image': image_file}, format='multipart',
+            )
+
     def test_upload_image(self):
         """Test uploading an image to recipe."""
         url = image_upload_url(self.recipe.id)
@@ -487,3 +1240,136 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(
+        RECIPE_IMAGE_WORKERS=0,
+        RECIPE_IMAGE_VARIANTS={'small': 50},
+    )
+    def test_upload_image_creates_variants(self):
+        """Test resized JPEG and WebP variants are made after upload."""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload_image(size=(200, 100))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        variants = self.recipe.image_variants['small']
+        self.assertEqual(set(variants), {'jpeg', 'webp'})
+        with default_storage.open(variants['webp']) as variant_file:
+            with Image.open(variant_file) as img:
+                self.assertEqual(img.format, 'WEBP')
+                self.assertEqual(img.size, (50, 25))
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertTrue(
+            res.data['image_variants']['small']['webp'].startswith('http')
+        )
+
+    @override_settings(RECIPE_IMAGE_WORKERS=2)
+    @patch('recipe.images._get_executor')
+    def test_upload_image_queues_variants(self, mock_get_executor):
+        """Test variants are made by the worker pool after commit."""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            res = self._upload_image()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        mock_get_executor.return_value.submit.assert_not_called()
+        for callback in callbacks:
+            callback()
+        mock_get_executor.return_value.submit.assert_called_once()
+
+    @override_settings(RECIPE_IMAGE_WORKERS=2)
+    @patch('recipe.images._executor', None)
+    @patch('recipe.images.ThreadPoolExecutor')
+    def test_worker_pool_created_once(self, mock_executor):
+        """Test concurrent first uploads share one worker pool."""
+        def slow_pool(**kwargs):
+            time.sleep(0.05)
+            return object()
+
+        mock_executor.side_effect = slow_pool
+        pools = []
+        threads = [
+            threading.Thread(
+                target=lambda: pools.append(images._get_executor()),
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        mock_executor.assert_called_once()
+        self.assertEqual(len({id(pool) for pool in pools}), 1)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100)
+    def test_upload_image_too_large_rejected(self):
+        """Test an image over the byte limit is rejected."""
+        res = self._upload_image()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=50)
+    def test_upload_image_too_many_pixels_rejected(self):
+        """Test an image over the pixel limit is rejected from its header."""
+        res = self._upload_image(size=(10, 10))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_image_moved_from_temp_dir(self):
+        """Test the streamed upload does not leave a temporary file."""
+        res = self._upload_image()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tmp_dir = os.path.join(settings.MEDIA_ROOT, 'uploads', 'tmp')
+        self.assertEqual(os.listdir(tmp_dir), [])
+
+    def test_upload_same_image_shares_file(self):
+        """Test identical uploads to two recipes share one stored file."""
+        other_recipe = create_recipe(user=self.user)
+        self._upload_image()
+        self._upload_image(recipe=other_recipe)
+
+        self.recipe.refresh_from_db()
+        other_recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, other_recipe.image.name)
+        digest = os.path.splitext(os.path.basename(self.recipe.image.name))[0]
+        self.assertEqual(len(digest), 64)
+
+    def test_replaced_image_left_for_gc(self):
+        """Test replacing an image leaves the old file to the gc command."""
+        self._upload_image(color='red')
+        self.recipe.refresh_from_db()
+        old_path = self.recipe.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload_image(color='blue')
+
+        self.assertTrue(os.path.exists(old_path))
+        call_command('gc_recipe_images', min_age=0, stdout=StringIO())
+        self.assertFalse(os.path.exists(old_path))
+
+    def test_deleted_recipe_image_left_for_gc(self):
+        """Test a deleted recipe's shared image is kept by the gc command."""
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        self._upload_image(color='green', recipe=r1)
+        self._upload_image(color='green', recipe=r2)
+        r1.refresh_from_db()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(detail_url(r1.id))
+        call_command('gc_recipe_images', min_age=0, stdout=StringIO())
+
+        self.assertTrue(os.path.exists(r1.image.path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(detail_url(r2.id))
+        call_command('gc_recipe_images', min_age=0, stdout=StringIO())
+
+        self.assertFalse(os.path.exists(r1.image.path))
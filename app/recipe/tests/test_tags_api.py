@@ -1,7 +1,7 @@
 """
 Tests for the tags API.
 """
-# from decimal import Decimal
+from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
@@ -11,11 +11,11 @@ from rest_framework.test import APIClient
 
 from core.models import (
     Tag,
-    # Recipe
+    Recipe,
 )
 
 from recipe.serializers import (
-    TagSerializer
+    TagUsageSerializer
 )
 
 
@@ -64,7 +64,7 @@ class PrivateTagsAPITest(TestCase):
         res = self.client.get(TAGS_URL)
 
         tags = Tag.objects.all().order_by('-name')
-        serializer = TagSerializer(tags, many=True)
+        serializer = TagUsageSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
@@ -95,6 +95,17 @@ class PrivateTagsAPITest(TestCase):
         tag.refresh_from_db()
         self.assertEqual(payload['name'], tag.name)
 
+    def test_update_tag_duplicate_name_error(self):
+        """Test renaming a tag to an existing tag name fails."""
+        Tag.objects.create(user=self.user, name='Dessert')
+        tag = Tag.objects.create(user=self.user, name='after dinner')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'after dinner')
+
     def test_delete_tag(self):
         """Test deleting a tag."""
         tag = Tag.objects.create(user=self.user, name='Breakfast')
@@ -107,44 +118,133 @@ class PrivateTagsAPITest(TestCase):
         tags = Tag.objects.filter(user=self.user)
         self.assertFalse(tags.exists())
 
-    # def test_filter_tags_assigned_to_recipes(self):
-    #     """Test listing tags to those assigned to recipes."""
-    #     tag1 = Tag.objects.create(user=self.user, name="apple")
-    #     tag2 = Tag.objects.create(user=self.user, name="orange")
-    #     recipe = Recipe.objects.create(
-    #         title='salad',
-    #         time_minutes=5,
-    #         price=Decimal('4.50'),
-    #         user=self.user
-    #     )
-    #     recipe.tags.add(tag1)
-
-    #     res = self.client.get(TAGS_URL, {'assigned_only': 1})
-
-    #     s1 = TagSerializer(tag1)
-    #     s2 = TagSerializer(tag2)
-    #     self.assertIn(s1.data, res.data)
-    #     self.assertNotIn(s2.data, res.data)
-
-    # def test_filter_tags_unique(self):
-    #     """Test filter tags returns a unique list."""
-    #     tag = Tag.objects.create(user=self.user, name='eggs')
-    #     Tag.objects.create(user=self.user, name='carrot')
-    #     r1 = Recipe.objects.create(
-    #         title='scrambled eggs',
-    #         time_minutes=5,
-    #         price=Decimal('2.50'),
-    #         user=self.user
-    #     )
-    #     r2 = Recipe.objects.create(
-    #         title='herb eggs',
-    #         time_minutes=15,
-    #         price=Decimal('1.50'),
-    #         user=self.user
-    #     )
-    #     r1.tags.add(tag)
-    #     r2.tags.add(tag)
-
-    #     res = self.client.get(TAGS_URL, {'assigned_only': 1})
-
-    #     self.assertEqual(len(res.data), 1)
+    def test_list_tags_cursor_pagination(self):
+        """Test paging through tags with a cursor."""
+        for name in ['Dinner', 'Lunch', 'Vegan']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        names = [item['name'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [item['name'] for item in res.data['results']]
+
+        self.assertIsNone(res.data['next'])
+        self.assertEqual(names, ['Vegan', 'Lunch', 'Dinner'])
+
+    def test_autocomplete_tags(self):
+        """Test q returns the user's tags starting with it, A to Z."""
+        for name in ['dessert', 'Dinner', 'Lunch', 'Dim sum']:
+            Tag.objects.create(user=self.user, name=name)
+        other_user = create_user(email='other@example.com')
+        Tag.objects.create(user=other_user, name='Dim')
+
+        res = self.client.get(TAGS_URL, {'q': 'di'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [item['name'] for item in res.data]
+        self.assertEqual(names, ['Dim sum', 'Dinner'])
+
+    def test_autocomplete_tags_non_ascii(self):
+        """Test q is upper cased the way the tag names are."""
+        for name in ['Straßenfest', 'Strasse', 'Crème brûlée', 'Crepes']:
+            Tag.objects.create(user=self.user, name=name)
+
+        for q, expected in [('straß', ['Straßenfest']),
+                            ('crè', ['Crème brûlée'])]:
+            with self.subTest(q=q):
+                res = self.client.get(TAGS_URL, {'q': q})
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                names = [item['name'] for item in res.data]
+                self.assertEqual(names, expected)
+
+    def test_autocomplete_tags_limit(self):
+        """Test q returns at most limit matches and rejects bad limits."""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        res = self.client.get(TAGS_URL, {'q': 'tag', 'limit': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [item['name'] for item in res.data]
+        self.assertEqual(names, ['Tag 0', 'Tag 1', 'Tag 2'])
+
+        res = self.client.get(TAGS_URL, {'q': 'tag', 'limit': 500})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_tags_by_usage(self):
+        """Test ordering=usage lists the most used tags first."""
+        for name, count in [('Lunch', 2), ('Dinner', 5), ('Brunch', 2)]:
+            Tag.objects.create(user=self.user, name=name, recipe_count=count)
+
+        res = self.client.get(TAGS_URL, {'ordering': 'usage'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['name'], item['recipe_count']) for item in res.data],
+            [('Dinner', 5), ('Brunch', 2), ('Lunch', 2)],
+        )
+
+        res = self.client.get(TAGS_URL, {'ordering': 'usage', 'page_size': 2})
+        names = [item['name'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [item['name'] for item in res.data['results']]
+
+        self.assertEqual(names, ['Dinner', 'Brunch', 'Lunch'])
+
+        res = self.client.get(TAGS_URL, {'ordering': 'popular'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_tags_assigned_to_recipes(self):
+        """Test listing tags to those assigned to recipes."""
+        tag1 = Tag.objects.create(user=self.user, name="apple")
+        tag2 = Tag.objects.create(user=self.user, name="orange")
+        recipe = Recipe.objects.create(
+            title='salad',
+            time_minutes=5,
+            price=Decimal('4.50'),
+            user=self.user
+        )
+        recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        tag1.refresh_from_db()
+        s1 = TagUsageSerializer(tag1)
+        s2 = TagUsageSerializer(tag2)
+        self.assertIn(s1.data, res.data)
+        self.assertNotIn(s2.data, res.data)
+
+    def test_filter_tags_unique(self):
+        """Test filter tags returns a unique list."""
+        tag = Tag.objects.create(user=self.user, name='eggs')
+        Tag.objects.create(user=self.user, name='carrot')
+        r1 = Recipe.objects.create(
+            title='scrambled eggs',
+            time_minutes=5,
+            price=Decimal('2.50'),
+            user=self.user
+        )
+        r2 = Recipe.objects.create(
+            title='herb eggs',
+            time_minutes=15,
+            price=Decimal('1.50'),
+            user=self.user
+        )
+        r1.tags.add(tag)
+        r2.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_filter_tags_assigned_bad_value(self):
+        """Test assigned_only only accepts 0 or 1."""
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,122 @@
+"""
+Streaming upload handling for recipe images.
+"""
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+from django.utils.translation import gettext as _
+from rest_framework.parsers import MultiPartParser
+
+
+class ImageUploadRejected(MultiPartParserError):
+    """Raised while streaming an image that breaks the upload limits."""
+
+
+class StreamedUploadedFile(UploadedFile):
+    """An upload already written to a temporary file under MEDIA_ROOT."""
+
+    def __init__(self, file, sha256, **kwargs):
+        super().__init__(file, **kwargs)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # The file was moved into place by the storage backend.
+            pass
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """Write image uploads to disk chunk by chunk while checking limits.
+
+    The byte limit is checked on every chunk and the pixel limit as
+    soon as the image header has arrived, so oversized images are
+    rejected before the rest of the body is read. Chunks are hashed on
+    the way through and written next to MEDIA_ROOT so saving the file
+    is a rename.
+    """
+    header_limit = 256 * 1024
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads', 'tmp')
+        os.makedirs(upload_dir, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(
+            suffix='.upload', dir=upload_dir,
+        )
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.header = b''
+        self.header_checked = False
+
+    def _reject(self, msg):
+        self.file.close()
+        raise ImageUploadRejected(msg)
+
+    def _check_header(self, raw_data):
+        """Reject the image once its header shows too many pixels."""
+        self.header += raw_data
+        try:
+            with Image.open(BytesIO(self.header)) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self._reject(_("Image has too many pixels."))
+        except Exception:
+            # Header incomplete (or not an image). Give up after the
+            # limit and leave the rest to the serializer validation.
+            if len(self.header) >= self.header_limit:
+                self.header_checked = True
+                self.header = b''
+            return
+
+        self.header_checked = True
+        self.header = b''
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            self._reject(_("Image has too many pixels."))
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.RECIPE_IMAGE_MAX_BYTES:
+            self._reject(_("Image file is too large."))
+        if not self.header_checked:
+            self._check_header(raw_data)
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.flush()
+        self.file.seek(0)
+        return StreamedUploadedFile(
+            file=self.file,
+            sha256=self.sha256.hexdigest(),
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.close()
+
+
+class RecipeImageUploadParser(MultiPartParser):
+    """Multipart parser streaming files through the image handler."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request.upload_handlers = [StreamingImageUploadHandler(request)]
+        return super().parse(stream, media_type, parser_context)
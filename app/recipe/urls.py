@@ -1,11 +1,13 @@
 """
 URL mapping for recipe app.
 """
+from django.conf import settings
 from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
 
 from recipe import views
+from recipe.async_views import async_read_path
 
 
 router = DefaultRouter()
@@ -18,3 +20,27 @@ app_name = 'recipe'
 urlpatterns = [
     path('', include(router.urls)),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Matched before the router's routes, which still serve the format
+    # suffixes. Detail ids are digits only, so the list actions (export,
+    # bulk) still reach the router.
+    urlpatterns = [
+        async_read_path(
+            r'^recipes/$', views.RecipeViewset, 'recipe',
+            {'get': 'list', 'post': 'create'},
+        ),
+        async_read_path(
+            r'^recipes/(?P<pk>[0-9]+)/$', views.RecipeViewset, 'recipe',
+            {'get': 'retrieve', 'put': 'update',
+             'patch': 'partial_update', 'delete': 'destroy'},
+            detail=True,
+        ),
+        async_read_path(
+            r'^tags/$', views.TagViewset, 'tag', {'get': 'list'},
+        ),
+        async_read_path(
+            r'^ingredients/$', views.IngredientViewset, 'ingredient',
+            {'get': 'list'},
+        ),
+    ] + urlpatterns
@@ -1,6 +1,10 @@
 """
 Views for The Recipe APIs.
 """
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext as _
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -13,8 +17,8 @@ from rest_framework import (
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from core.models import (
@@ -25,99 +29,377 @@ from core.models import (
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
-    TagSerializer,
-    IngredientSerializer,
+    TagUsageSerializer,
+    IngredientUsageSerializer,
     RecipeImageSerializer,
+    RecipeBulkSerializer,
+    RecipeValuesSerializer,
+    RecipeExportSerializer,
 )
+from recipe.export import aiter_chunks, flatten_for_csv, iter_recipes
+from recipe.async_views import AsyncListModelMixin, AsyncRetrieveModelMixin
+from recipe.cache import CachedListMixin
+from recipe.images import schedule_variants
+from recipe.uploads import RecipeImageUploadParser
+from recipe.pagination import (
+    RecipeCursorPagination,
+    RecipeAttrCursorPagination,
+)
+from core.renderers import NDJSONRenderer, CSVRenderer
+from core.routers import ReplicaReadMixin
+from user.authentication import CachedTokenAuthentication
+
+
+RECIPE_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='comma separated list of ids to filter'
+    ),
+    OpenApiParameter(
+        'ingredients',
+        OpenApiTypes.STR,
+        description='comma separated list of ids to filter'
+    ),
+    OpenApiParameter(
+        'match',
+        OpenApiTypes.STR,
+        enum=['any', 'all'],
+        description='match recipes having any (default) or all '
+                    'of the given tags and ingredients'
+    ),
+    OpenApiParameter(
+        'search',
+        OpenApiTypes.STR,
+        description='search titles, descriptions, tags and '
+                    'ingredients, best matches first'
+    ),
+]
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='comma separated list of fields to return'
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        enum=['tags', 'ingredients', 'tags,ingredients'],
+        description='relations to return as objects rather than '
+                    'ids (all of them when fields is not given)'
+    ),
+]
 
 
 @extend_schema_view(
     list=extend_schema(
-        parameters=[
-            OpenApiParameter(
-                'tags',
-                OpenApiTypes.STR,
-                description='comma separated list of ids to filter'
-            ),
-            OpenApiParameter(
-                'ingredients',
-                OpenApiTypes.STR,
-                description='comma separated list of ids to filter'
-            )
-        ]
-    )
+        parameters=RECIPE_FILTER_PARAMETERS + SPARSE_FIELDS_PARAMETERS,
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
+    export=extend_schema(
+        parameters=RECIPE_FILTER_PARAMETERS + SPARSE_FIELDS_PARAMETERS,
+        responses={
+            (200, NDJSONRenderer.media_type): RecipeExportSerializer,
+            (200, CSVRenderer.media_type): OpenApiTypes.STR,
+        },
+    ),
 )
-class RecipeViewset(viewsets.ModelViewSet):
+class RecipeViewset(CachedListMixin,
+                    ReplicaReadMixin,
+                    AsyncListModelMixin,
+                    AsyncRetrieveModelMixin,
+                    viewsets.ModelViewSet):
     """View for manage recipe APIs."""
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    related_fields = ('tags', 'ingredients')
+    export_chunk_size = 1000
 
     def _params_to_ints(self, qs):
         """Convert an string to list of integers."""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _param_to_names(self, param, allowed):
+        """Convert a comma separated param to names, rejecting unknowns."""
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        names = [name for name in value.split(',') if name]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise ValidationError({param: _(
+                'Unknown fields: %(names)s.'
+            ) % {'names': ', '.join(unknown)}})
+
+        return names
+
+    def get_sparse_fields(self):
+        """Return the fields and expanded relations to render.
+
+        Without `fields` every field is rendered and every relation
+        expanded, as before.
+        """
+        all_fields = self.get_serializer_class().Meta.fields
+        fields = self._param_to_names('fields', all_fields)
+        expand = self._param_to_names('expand', self.related_fields)
+        if expand is None and fields is not None:
+            expand = []
+
+        return fields or all_fields, expand
+
+    def _sparse_queryset(self, queryset):
+        """Only load the columns and relations that will be rendered."""
+        fields, expand = self.get_sparse_fields()
+        queryset = queryset.only(
+            *(name for name in fields if name not in self.related_fields)
+        )
+        for name in self.related_fields:
+            if name not in fields:
+                continue
+            model = Recipe._meta.get_field(name).related_model
+            related = model.objects.order_by('id')
+            if expand is not None and name not in expand:
+                related = related.only('id')
+            queryset = queryset.prefetch_related(
+                Prefetch(name, queryset=related),
+            )
+
+        return queryset
+
+    def _values_queryset(self, queryset, search):
+        """Return rows of the rendered columns for the list fast path.
+
+        The id (and rank when searching) is always included as the
+        cursor pagination orders by it.
+        """
+        fields, _expand = self.get_sparse_fields()
+        columns = ['id'] + [
+            name for name in fields
+            if name != 'id' and name not in self.related_fields
+        ]
+        if search:
+            columns.append('rank')
+
+        return queryset.values(*columns)
+
     def get_queryset(self):
         """retrieve recipes for authenticated user."""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': _("Must be 'any' or 'all'.")})
+        match_all = match == 'all'
         queryset = self.queryset
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = queryset.with_tags(tag_ids, match_all)
         if ingredients:
             ing_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ing_ids)
-        return queryset.filter(
+            queryset = queryset.with_ingredients(ing_ids, match_all)
+        queryset = queryset.filter(
             user=self.request.user
-            ).order_by('-id').distinct()
+            ).order_by('-id')
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = queryset.search(search)
+        if self.action in ('list', 'export'):
+            queryset = self._values_queryset(queryset, search)
+        elif self.action == 'retrieve':
+            queryset = self._sparse_queryset(queryset)
+        else:
+            queryset = queryset.prefetch_related('tags', 'ingredients')
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'list':
             return RecipeSerializer
+        elif self.action == 'export':
+            return RecipeExportSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
+        elif self.action == 'bulk':
+            return RecipeBulkSerializer
 
         return self.serializer_class
 
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve', 'export'):
+            kwargs['fields'], kwargs['expand'] = self.get_sparse_fields()
+        if self.action in ('list', 'export') and kwargs.get('many'):
+            kwargs.setdefault('context', self.get_serializer_context())
+            return RecipeValuesSerializer(
+                *args, serializer_class=self.get_serializer_class(), **kwargs
+            )
+
+        return super().get_serializer(*args, **kwargs)
+
     def perform_create(self, serializer):
         """create new recipe."""
         serializer.save(user=self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @action(
+        methods=['POST'],
+        detail=True,
+        url_path='upload-image',
+        parser_classes=[RecipeImageUploadParser],
+    )
     def upload_image(self, request, pk=None):
         """Upload an image to recipe."""
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save(image_variants={})
+            schedule_variants(recipe)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='export',
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request):
+        """Stream all of the user's recipes as NDJSON or CSV."""
+        renderer = request.accepted_renderer
+        items = iter_recipes(
+            self.filter_queryset(self.get_queryset()),
+            lambda rows: self.get_serializer(rows, many=True).data,
+            chunk_size=self.export_chunk_size,
+        )
+        if renderer.format == 'csv':
+            items = map(flatten_for_csv, items)
+        content = renderer.render_items(items)
+        if isinstance(request._request, ASGIRequest):
+            content = aiter_chunks(content, self.export_chunk_size)
+        response = StreamingHttpResponse(
+            content, content_type=renderer.media_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+        return response
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create, update and delete many recipes in one request."""
+        serializer = self.get_serializer(data=request.data)
+
+        if serializer.is_valid():
+            serializer.save(user=self.request.user)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class BaseRecipeAttrViewset(mixins.DestroyModelMixin,
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='only return names starting with this text, '
+                            'ignoring case, A to Z'
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='max number of matches for q '
+                            '(default 10, at most 50)'
+            ),
+            OpenApiParameter(
+                'assigned_only',
+                OpenApiTypes.INT,
+                enum=[0, 1],
+                description='1 to only return items used by a recipe'
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                enum=['name', 'usage'],
+                description='name (default), or usage for the most used '
+                            'first'
+            ),
+        ]
+    )
+)
+class BaseRecipeAttrViewset(CachedListMixin,
+                            ReplicaReadMixin,
+                            AsyncListModelMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base Viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
+    autocomplete_limit = 10
+    max_autocomplete_limit = 50
+
+    def _get_limit(self):
+        limit = self.request.query_params.get('limit')
+        if limit is None:
+            return self.autocomplete_limit
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= self.max_autocomplete_limit:
+            raise ValidationError({'limit': _(
+                'Must be a number between 1 and %(max)d.'
+            ) % {'max': self.max_autocomplete_limit}})
+
+        return limit
+
+    def _by_usage(self):
+        ordering = self.request.query_params.get('ordering', 'name')
+        if ordering not in ('name', 'usage'):
+            raise ValidationError({'ordering': _(
+                'Must be "name" or "usage".'
+            )})
+
+        return ordering == 'usage'
+
+    def _assigned_only(self):
+        assigned_only = self.request.query_params.get('assigned_only', '0')
+        if assigned_only not in ('0', '1'):
+            raise ValidationError({'assigned_only': _('Must be 0 or 1.')})
+
+        return assigned_only == '1'
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action != 'list':
+            return queryset.order_by('-name')
+        by_usage = self._by_usage()
+        if self._assigned_only():
+            queryset = queryset.assigned()
+        q = self.request.query_params.get('q')
+        if q:
+            queryset = queryset.autocomplete(q)
+            if by_usage:
+                queryset = queryset.by_usage()
+            return queryset[:self._get_limit()]
+
+        return queryset.by_usage() if by_usage else queryset.order_by('-name')
 
 
 class TagViewset(BaseRecipeAttrViewset):
     """view for manage Tags APIs."""
-    serializer_class = TagSerializer
+    serializer_class = TagUsageSerializer
     queryset = Tag.objects.all()
 
 
 class IngredientViewset(BaseRecipeAttrViewset):
     """Manage Ingredients in the DB."""
-    serializer_class = IngredientSerializer
+    serializer_class = IngredientUsageSerializer
     queryset = Ingredient.objects.all()
@@ -0,0 +1,101 @@
+"""
+Authentication for the APIs.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+
+
+def _token_cache_key(key):
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'auth:token:{digest}'
+
+
+def evict_token(key):
+    """Drop a token from the authentication cache."""
+    cache.delete(_token_cache_key(key))
+
+
+def evict_user_tokens(user_id):
+    """Drop every cached token of a user."""
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    cache.delete_many([_token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token and its user.
+
+    Entries live for AUTH_TOKEN_CACHE_TIMEOUT seconds and are evicted
+    as soon as the token is deleted or its user is saved or deleted.
+    aauthenticate() is the same check for async views, using the async
+    cache and ORM APIs.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = _token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(
+            cache_key,
+            (user, token),
+            timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT,
+        )
+
+        return user, token
+
+    async def aauthenticate(self, request):
+        """Async version of authenticate()."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            msg = _('Invalid token header. No credentials provided.')
+            raise exceptions.AuthenticationFailed(msg)
+        if len(auth) > 2:
+            msg = _('Invalid token header. '
+                    'Token string should not contain spaces.')
+            raise exceptions.AuthenticationFailed(msg)
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            msg = _('Invalid token header. '
+                    'Token string should not contain invalid characters.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        """Async version of authenticate_credentials()."""
+        cache_key = _token_cache_key(key)
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            token = await self.get_model().objects.select_related(
+                'user',
+            ).aget(key=key)
+        except self.get_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'),
+            )
+        await cache.aset(
+            cache_key,
+            (token.user, token),
+            timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT,
+        )
+
+        return token.user, token
@@ -0,0 +1,100 @@
+"""
+Authentication backends for the user app.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def hash_executor():
+    """Return the pool of threads passwords are hashed on."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix='password-hash',
+            )
+
+    return _executor
+
+
+def _check_password(password, encoded):
+    """Return whether a password matches, and a new hash if outdated."""
+    is_correct, must_update = verify_password(password, encoded)
+    if is_correct and must_update:
+        return True, make_password(password)
+
+    return is_correct, None
+
+
+class HashWorkerBackend(ModelBackend):
+    """ModelBackend hashing passwords on PASSWORD_HASH_WORKERS threads.
+
+    Hashing is CPU bound and releases the GIL, so a login storm keeps
+    at most that many cores busy instead of one per request thread.
+    aauthenticate() awaits the same threads without holding one itself.
+    Hashes from an older hasher or with older costs are replaced on a
+    successful login.
+    """
+
+    def _username(self, username, kwargs):
+        if username is None:
+            return kwargs.get(get_user_model().USERNAME_FIELD)
+
+        return username
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        username = self._username(username, kwargs)
+        if username is None or password is None:
+            return None
+        user_model = get_user_model()
+        try:
+            user = user_model._default_manager.get_by_natural_key(username)
+        except user_model.DoesNotExist:
+            # Hash anyway, so unknown emails take as long as known ones.
+            hash_executor().submit(make_password, password).result()
+            return None
+
+        is_correct, new_hash = hash_executor().submit(
+            _check_password, password, user.password,
+        ).result()
+        if new_hash is not None:
+            user.password = new_hash
+            user.save(update_fields=['password'])
+        if is_correct and self.user_can_authenticate(user):
+            return user
+
+    async def aauthenticate(self, request, username=None, password=None,
+                            **kwargs):
+        username = self._username(username, kwargs)
+        if username is None or password is None:
+            return None
+        user_model = get_user_model()
+        try:
+            user = await user_model._default_manager.aget_by_natural_key(
+                username,
+            )
+        except user_model.DoesNotExist:
+            await asyncio.wrap_future(
+                hash_executor().submit(make_password, password),
+            )
+            return None
+
+        is_correct, new_hash = await asyncio.wrap_future(
+            hash_executor().submit(_check_password, password, user.password),
+        )
+        if new_hash is not None:
+            user.password = new_hash
+            await user.asave(update_fields=['password'])
+        if is_correct and self.user_can_authenticate(user):
+            return user
@@ -4,8 +4,10 @@ Serializer for the user api view.
 
 from django.contrib.auth import (
     get_user_model,
+    aauthenticate,
     authenticate,
     )
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
@@ -44,18 +46,52 @@ class AuthTokenSerializer(serializers.Serializer):
         trim_whitespace=False
     )
 
-    def validate(self, attrs):
-        """Validate and authenticate the user."""
-        email = attrs.get('email')
-        password = attrs.get('password')
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password,
-        )
+    def _authenticated(self, attrs, user):
         if not user:
             msg = _("Unable to authenticate with privided credentials.")
             raise serializers.ValidationError(msg, code='authorization')
 
         attrs['user'] = user
         return attrs
+
+    def validate(self, attrs):
+        """Validate and authenticate the user."""
+        user = authenticate(
+            request=self.context.get('request'),
+            username=attrs.get('email'),
+            password=attrs.get('password'),
+        )
+        return self._authenticated(attrs, user)
+
+    async def avalidate(self, attrs):
+        """Async version of validate()."""
+        user = await aauthenticate(
+            request=self.context.get('request'),
+            username=attrs.get('email'),
+            password=attrs.get('password'),
+        )
+        return self._authenticated(attrs, user)
+
+    async def ais_valid(self, raise_exception=False):
+        """Async version of is_valid(), awaiting the password check.
+
+        The field checks make no queries, so they run as they are.
+        """
+        try:
+            attrs = self.to_internal_value(self.initial_data)
+            try:
+                attrs = await self.avalidate(attrs)
+            except (serializers.ValidationError,
+                    DjangoValidationError) as exc:
+                raise serializers.ValidationError(
+                    detail=serializers.as_serializer_error(exc),
+                )
+        except serializers.ValidationError as exc:
+            self._validated_data, self._errors = {}, exc.detail
+        else:
+            self._validated_data, self._errors = attrs, {}
+
+        if self._errors and raise_exception:
+            raise serializers.ValidationError(self.errors)
+
+        return not bool(self._errors)
@@ -0,0 +1,21 @@
+"""
+Signal handlers for the user app.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import evict_token, evict_user_tokens
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a token from the cache once it is deleted."""
+    evict_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def evict_saved_user_tokens(sender, instance, **kwargs):
+    """Drop cached tokens so the next request sees the saved user."""
+    evict_user_tokens(instance.pk)
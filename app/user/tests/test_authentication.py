@@ -0,0 +1,115 @@
+"""
+Tests for cached token authentication.
+"""
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from user.authentication import CachedTokenAuthentication
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='test user',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_no_queries(self):
+        """Test repeated requests with a token do not query the db."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_evicted(self):
+        """Test a deleted token stops working straight away."""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_evicted(self):
+        """Test a deactivated user's token stops working straight away."""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_evicted(self):
+        """Test profile updates are visible on the next request."""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'new name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'new name')
+
+
+class AsyncCachedTokenAuthenticationTests(TestCase):
+    """Test the async version of cached token authentication."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def _authenticate(self, header):
+        request = RequestFactory().get(ME_URL, HTTP_AUTHORIZATION=header)
+        return async_to_sync(self.auth.aauthenticate)(request)
+
+    def test_shares_cache_with_sync(self):
+        """Test a token cached by either version serves the other."""
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self._authenticate(f'Token {self.token.key}')
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token, self.token)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected."""
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate('Token invalid')
+
+    def test_other_scheme_ignored(self):
+        """Test other authorization schemes are left to others."""
+        self.assertIsNone(self._authenticate('Basic abc'))
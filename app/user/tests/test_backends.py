@@ -0,0 +1,117 @@
+"""
+Tests for the authentication backend and password hashers.
+"""
+from unittest import skipUnless
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import aauthenticate, authenticate, get_user_model
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+from django.test import TestCase, override_settings
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+
+SHA1_FIRST = [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+]
+SHA256_FIRST = SHA1_FIRST[::-1]
+
+
+class HashWorkerBackendTests(TestCase):
+    """Test logging in with passwords hashed on the worker threads."""
+
+    def setUp(self):
+        with override_settings(PASSWORD_HASHERS=SHA1_FIRST):
+            self.user = get_user_model().objects.create_user(
+                email='test@example.com',
+                password='testpass123',
+            )
+
+    def test_authenticate(self):
+        """Test good credentials return the user and bad ones None."""
+        user = authenticate(username='test@example.com',
+                            password='testpass123')
+
+        self.assertEqual(user, self.user)
+        self.assertIsNone(authenticate(username='test@example.com',
+                                       password='wrong'))
+        self.assertIsNone(authenticate(username='nobody@example.com',
+                                       password='testpass123'))
+
+    def test_aauthenticate(self):
+        """Test the async backend checks credentials as the sync one."""
+        user = async_to_sync(aauthenticate)(
+            username='test@example.com', password='testpass123',
+        )
+
+        self.assertEqual(user, self.user)
+        self.assertIsNone(async_to_sync(aauthenticate)(
+            username='test@example.com', password='wrong',
+        ))
+
+    def test_inactive_user_rejected(self):
+        """Test inactive users cannot log in."""
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertIsNone(authenticate(username='test@example.com',
+                                       password='testpass123'))
+
+    @override_settings(PASSWORD_HASHERS=SHA256_FIRST)
+    def test_login_upgrades_hash(self):
+        """Test a hash from an older hasher is replaced on login."""
+        self.assertIsNone(authenticate(username='test@example.com',
+                                       password='wrong'))
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm,
+                         'pbkdf2_sha1')
+
+        authenticate(username='test@example.com', password='testpass123')
+
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm,
+                         'pbkdf2_sha256')
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    @override_settings(PASSWORD_HASHERS=SHA256_FIRST)
+    def test_alogin_upgrades_hash(self):
+        """Test the async backend replaces outdated hashes too."""
+        async_to_sync(aauthenticate)(
+            username='test@example.com', password='testpass123',
+        )
+
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm,
+                         'pbkdf2_sha256')
+
+
+@skipUnless(argon2, 'argon2-cffi is not installed')
+@override_settings(
+    PASSWORD_HASHERS=['user.hashers.Argon2PasswordHasher'],
+    ARGON2_TIME_COST=1,
+    ARGON2_MEMORY_COST=8192,
+    ARGON2_PARALLELISM=1,
+)
+class Argon2PasswordHasherTests(TestCase):
+    """Test Argon2 hashes use the configured costs."""
+
+    def test_costs_from_settings(self):
+        """Test hashes are made with the costs in settings."""
+        hasher = get_hasher()
+        decoded = hasher.decode(hasher.encode('testpass123', hasher.salt()))
+
+        self.assertEqual(decoded['time_cost'], 1)
+        self.assertEqual(decoded['memory_cost'], 8192)
+        self.assertEqual(decoded['parallelism'], 1)
+
+    def test_changed_costs_rehash(self):
+        """Test hashes made with other costs are updated."""
+        encoded = get_hasher().encode('testpass123', get_hasher().salt())
+
+        self.assertFalse(get_hasher().must_update(encoded))
+        with override_settings(ARGON2_TIME_COST=2):
+            self.assertTrue(get_hasher().must_update(encoded))
@@ -1,13 +1,22 @@
 """
 Tests for users api.
 """
-from django.test import TestCase
+import asyncio
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory, TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from user.throttling import LoginRateThrottle
+from user.views import AsyncCreateTokenView, CreateTokenView
+
 
 CREATE_USER_URL = reverse("user:create")
 TOKEN_URL = reverse("user:token")
@@ -23,6 +32,8 @@ class PublicUserAPITests(TestCase):
     """Tests the public features of user api."""
 
     def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
         self.client = APIClient()
 
     def test_create_user_success(self):
@@ -102,6 +113,132 @@ class PublicUserAPITests(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @patch.object(LoginRateThrottle, 'THROTTLE_RATES', {
+        'login': '2/min', 'login_ip': '10/min', 'login_email': '10/min',
+    })
+    def test_create_token_throttled(self):
+        """Test repeated logins are rejected before any hashing."""
+        create_user(email='test@example.com', password='goodpass')
+        payload = {'email': 'test@example.com', 'password': 'badpass'}
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch('user.backends.hash_executor') as hash_executor:
+            res = self.client.post(TOKEN_URL, {
+                **payload, 'email': 'TEST@example.com',
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        hash_executor.assert_not_called()
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'other@example.com', 'password': 'badpass',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.object(LoginRateThrottle, 'THROTTLE_RATES', {
+        'login': '10/min', 'login_ip': '3/min', 'login_email': '10/min',
+    })
+    def test_create_token_throttled_per_ip(self):
+        """Test one client trying many emails is throttled."""
+        for i in range(3):
+            res = self.client.post(TOKEN_URL, {
+                'email': f'user{i}@example.com', 'password': 'badpass',
+            })
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch('user.backends.hash_executor') as hash_executor:
+            res = self.client.post(TOKEN_URL, {
+                'email': 'user9@example.com', 'password': 'badpass',
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        hash_executor.assert_not_called()
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'user9@example.com', 'password': 'badpass',
+        }, REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.object(LoginRateThrottle, 'THROTTLE_RATES', {
+        'login': '10/min', 'login_ip': '10/min', 'login_email': '3/min',
+    })
+    def test_create_token_throttled_per_email(self):
+        """Test many clients trying one email are throttled."""
+        payload = {'email': 'test@example.com', 'password': 'badpass'}
+        for i in range(3):
+            res = self.client.post(
+                TOKEN_URL, payload, REMOTE_ADDR=f'10.0.0.{i}',
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch('user.backends.hash_executor') as hash_executor:
+            res = self.client.post(
+                TOKEN_URL, payload, REMOTE_ADDR='10.0.0.9',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        hash_executor.assert_not_called()
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'other@example.com', 'password': 'badpass',
+        }, REMOTE_ADDR='10.0.0.9')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_token_async_throttles_off_loop(self):
+        """Test the async token view checks throttles off the event loop."""
+        on_loop = []
+
+        def initial(view, request, *args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                on_loop.append(False)
+            else:
+                on_loop.append(True)
+            return original(view, request, *args, **kwargs)
+
+        original = CreateTokenView.initial
+        view = csrf_exempt(AsyncCreateTokenView.as_view())
+        with patch.object(CreateTokenView, 'initial', autospec=True,
+                          side_effect=initial):
+            res = async_to_sync(view)(AsyncRequestFactory().post(
+                TOKEN_URL,
+                {'email': 'test@example.com', 'password': 'badpass'},
+                content_type='application/json',
+            ))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(on_loop, [False])
+
+    def test_create_token_async(self):
+        """Test the async token view logs in as the sync view does."""
+        user = create_user(email='test@example.com', password='goodpass')
+        view = csrf_exempt(AsyncCreateTokenView.as_view())
+        factory = AsyncRequestFactory()
+
+        res = async_to_sync(view)(factory.post(
+            TOKEN_URL,
+            {'email': 'test@example.com', 'password': 'goodpass'},
+            content_type='application/json',
+        ))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(user.auth_token.key, res.content.decode())
+
+        res = async_to_sync(view)(factory.post(
+            TOKEN_URL,
+            {'email': 'test@example.com', 'password': 'badpass'},
+            content_type='application/json',
+        ))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(b'non_field_errors', res.content)
+
     def test_retrieve_user_unauthorized(self):
         """Test authentication is required for users."""
         res = self.client.get(ME_URL)
@@ -0,0 +1,61 @@
+"""
+Throttles for the user APIs.
+"""
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """Limit login attempts per email and client IP.
+
+    Throttles run before the serializer, so rejected attempts cost no
+    password hashing.
+    """
+    scope = 'login'
+
+    def get_email(self, request):
+        """Return the normalized email being logged in with, or ''."""
+        data = request.data
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not isinstance(email, str):
+            return ''
+
+        return email.strip().lower()
+
+    def get_login_ident(self, request):
+        """Return what attempts are counted by, or None to not count."""
+        return f'{self.get_email(request)}:{self.get_ident(request)}'
+
+    def get_cache_key(self, request, view):
+        ident = self.get_login_ident(request)
+        if ident is None:
+            return None
+
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': hashlib.sha256(ident.encode()).hexdigest(),
+        }
+
+
+class LoginIPRateThrottle(LoginRateThrottle):
+    """Limit login attempts per client IP, whatever the email.
+
+    Stops one client trying many emails (credential stuffing).
+    """
+    scope = 'login_ip'
+
+    def get_login_ident(self, request):
+        return self.get_ident(request)
+
+
+class LoginEmailRateThrottle(LoginRateThrottle):
+    """Limit login attempts per email, whatever the client IP.
+
+    Stops many clients guessing the password of one account. Attempts
+    without an email fail validation before hashing, so are not counted.
+    """
+    scope = 'login_email'
+
+    def get_login_ident(self, request):
+        return self.get_email(request) or None
@@ -1,7 +1,10 @@
 """
 Url mappings for user api.
 """
+from django.conf import settings
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
 from user import views
 
 
@@ -12,3 +15,13 @@ urlpatterns = [
     path('token/', views.CreateTokenView.as_view(), name='token'),
     path('me/', views.ManageUserView.as_view(), name='me'),
 ]
+
+if settings.ASYNC_LOGIN_VIEW:
+    # Matched before the sync token view.
+    urlpatterns = [
+        path(
+            'token/',
+            csrf_exempt(views.AsyncCreateTokenView.as_view()),
+            name='token',
+        ),
+    ] + urlpatterns
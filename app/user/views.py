@@ -1,14 +1,24 @@
 """
 Views for user api.
 """
-
-from rest_framework import generics, authentication, permissions
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import generics, permissions
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
 )
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+from user.authentication import CachedTokenAuthentication
+from user.throttling import (
+    LoginEmailRateThrottle,
+    LoginIPRateThrottle,
+    LoginRateThrottle,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -20,12 +30,69 @@ class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # Logging in needs no session, so nothing is queried before the
+    # throttle has had its say.
+    authentication_classes = []
+    throttle_classes = [
+        LoginIPRateThrottle,
+        LoginEmailRateThrottle,
+        LoginRateThrottle,
+    ]
+
+    async def apost(self, request, *args, **kwargs):
+        """Async version of post()."""
+        serializer = self.get_serializer(data=request.data)
+        await serializer.ais_valid(raise_exception=True)
+        token, _created = await Token.objects.aget_or_create(
+            user=serializer.validated_data['user'],
+        )
+
+        return Response({'token': token.key})
+
+
+class AsyncCreateTokenView(View):
+    """Serve CreateTokenView on the event loop, for ASGI deployments.
+
+    POST awaits the password check on the hash worker threads, so a
+    login holds no thread while its password is hashed. Other methods
+    are handed to the sync view.
+    """
+    sync_view = CreateTokenView.as_view()
+
+    async def post(self, request, *args, **kwargs):
+        view = CreateTokenView()
+        view.args, view.kwargs = args, kwargs
+        view.headers = view.default_response_headers
+        view.request = request = view.initialize_request(
+            request, *args, **kwargs
+        )
+        view.format_kwarg = None
+        try:
+            # Content negotiation and throttling, no queries, but the
+            # throttles read and write the cache.
+            await sync_to_async(view.initial)(request, *args, **kwargs)
+            response = await view.apost(request, *args, **kwargs)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+
+        response = view.finalize_response(request, response, *args, **kwargs)
+        response.render()
+        return HttpResponse(
+            response.content,
+            status=response.status_code,
+            headers=response.headers,
+        )
+
+    async def _sync(self, request, *args, **kwargs):
+        return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    get = put = patch = delete = options = _sync
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the Authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):